@@ -0,0 +1,279 @@
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Crypto markets trade every day of the year
+PERIODS_PER_YEAR = 365
+# date.toordinal() of 1970-01-01, the numpy datetime64 epoch
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Newton iterates above this annual rate are treated as diverged in xirr
+MAX_RATE = 1e6
+
+
+def _rounded(value, digits: int = 2) -> Optional[float]:
+    """Round for the API; undefined metrics (NaN/inf) become None"""
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits)
+
+
+def _iso(day_ordinal) -> str:
+    return date.fromordinal(int(day_ordinal)).isoformat()
+
+
+def _iso_array(day_ordinals: np.ndarray) -> list:
+    """ISO date strings for many date ordinals at once"""
+    return np.datetime_as_string((day_ordinals - EPOCH_ORDINAL).astype("datetime64[D]")).tolist()
+
+
+def simple_returns(totals: np.ndarray) -> np.ndarray:
+    """Entry-to-entry returns; NaN where the previous total isn't positive"""
+    previous = totals[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, totals[1:] / previous - 1, np.nan)
+
+
+def max_drawdown(totals: np.ndarray) -> Dict:
+    """Deepest peak-to-trough fall, with the indices of its peak, trough and recovery (or None)"""
+    running_peak = np.maximum.accumulate(totals)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(running_peak > 0, totals / running_peak - 1, 0.0)
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(totals[: trough + 1]))
+    recovered = np.flatnonzero(totals[trough:] >= totals[peak]) if drawdowns[trough] < 0 else np.array([])
+    return {
+        "depth": float(drawdowns[trough]),
+        "peak": peak,
+        "trough": trough,
+        "recovery": trough + int(recovered[0]) if len(recovered) else None,
+    }
+
+
+def risk_metrics(days: np.ndarray, totals: np.ndarray, risk_free_rate: float = 0.0) -> Dict:
+    """Risk report for a portfolio value series.
+
+    `days` are date ordinals and `totals` portfolio values, both in chain order.
+    Returns are measured entry to entry (one entry per day is the norm) and
+    annualized over 365 periods; `risk_free_rate` is annual. Percentages are in
+    percent, like pnl_percentage.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    totals = np.asarray(totals, dtype=np.float64)
+    report = {
+        "entries": len(totals),
+        "start_date": _iso(days[0]) if len(days) else None,
+        "end_date": _iso(days[-1]) if len(days) else None,
+        "daily_volatility": None,
+        "annualized_volatility": None,
+        "annualized_return": None,
+        "sharpe_ratio": None,
+        "sortino_ratio": None,
+        "max_drawdown": None,
+        "max_drawdown_peak_date": None,
+        "max_drawdown_trough_date": None,
+        "recovery_date": None,
+        "recovery_days": None,
+        "calmar_ratio": None,
+    }
+    if len(totals) < 2:
+        return report
+
+    returns = simple_returns(totals)
+    returns = returns[np.isfinite(returns)]
+    periodic_risk_free = (1 + risk_free_rate) ** (1 / PERIODS_PER_YEAR) - 1
+    annualizer = np.sqrt(PERIODS_PER_YEAR)
+
+    if len(returns) > 1:
+        excess = returns.mean() - periodic_risk_free
+        volatility = returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(returns - periodic_risk_free, 0) ** 2))
+        report["daily_volatility"] = _rounded(volatility * 100)
+        report["annualized_volatility"] = _rounded(volatility * annualizer * 100)
+        report["sharpe_ratio"] = _rounded(excess / volatility * annualizer) if volatility > 0 else None
+        report["sortino_ratio"] = _rounded(excess / downside * annualizer) if downside > 0 else None
+
+    years = (days[-1] - days[0]) / PERIODS_PER_YEAR
+    annualized_return = None
+    if years > 0 and totals[0] > 0 and totals[-1] > 0:
+        annualized_return = (totals[-1] / totals[0]) ** (1 / years) - 1
+        report["annualized_return"] = _rounded(annualized_return * 100)
+
+    drawdown = max_drawdown(totals)
+    if drawdown["depth"] < 0:
+        report["max_drawdown"] = _rounded(drawdown["depth"] * 100)
+        report["max_drawdown_peak_date"] = _iso(days[drawdown["peak"]])
+        report["max_drawdown_trough_date"] = _iso(days[drawdown["trough"]])
+        if drawdown["recovery"] is not None:
+            report["recovery_date"] = _iso(days[drawdown["recovery"]])
+            report["recovery_days"] = int(days[drawdown["recovery"]] - days[drawdown["trough"]])
+        if annualized_return is not None:
+            report["calmar_ratio"] = _rounded(annualized_return / abs(drawdown["depth"]))
+    else:
+        report["max_drawdown"] = 0.0
+
+    return report
+
+
+def flow_adjusted_returns(
+    days: np.ndarray, totals: np.ndarray, flow_days: np.ndarray, flow_amounts: np.ndarray
+) -> np.ndarray:
+    """Entry-to-entry returns with external cash flows taken out.
+
+    A flow dated in (days[i-1], days[i]] is assumed to arrive at the start of that
+    interval, so return i is totals[i] / (totals[i-1] + flows) - 1. Flows on or
+    before the first entry are already part of its total. NaN where the invested
+    base isn't positive.
+    """
+    interval = np.searchsorted(days, flow_days, side="left")
+    inside = (interval >= 1) & (interval < len(days))
+    flows = np.bincount(interval[inside], weights=flow_amounts[inside], minlength=len(days))
+    base = totals[:-1] + flows[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base > 0, totals[1:] / base - 1, np.nan)
+
+
+def xirr(
+    flow_days: np.ndarray, amounts: np.ndarray, tolerance: float = 1e-10, max_iterations: int = 100
+) -> Optional[float]:
+    """Annual internal rate of return of dated cash flows, or None when there is none.
+
+    Newton's method runs from a spread of starting rates at once, one row of a
+    (guesses x flows) matrix each, and the converged root nearest 10% wins. This
+    keeps a bad first guess from diverging or landing on an odd root.
+    """
+    if not (np.any(amounts > 0) and np.any(amounts < 0)):
+        return None
+    years = (flow_days - flow_days.min()) / PERIODS_PER_YEAR
+    rates = np.array([-0.5, -0.2, 0.0, 0.1, 0.3, 1.0, 3.0])
+    scale = np.abs(amounts).sum()
+
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        # Rows drop out once they converge or run off towards infinity
+        active = np.ones(len(rates), dtype=bool)
+        for _ in range(max_iterations):
+            growth = 1 + rates[active, None]
+            discounted = amounts * growth**-years
+            npv = discounted.sum(axis=1)
+            slope = (-years * discounted / growth).sum(axis=1)
+            step = np.where(slope != 0, npv / slope, np.nan)
+            rates[active] = np.maximum(rates[active] - step, -0.999999)
+            active[active] = np.isfinite(step) & (np.abs(step) >= tolerance) & (rates[active] < MAX_RATE)
+            if not active.any():
+                break
+        npv = (amounts * (1 + rates[:, None]) ** -years).sum(axis=1)
+
+    converged = np.isfinite(rates) & np.isfinite(npv) & (np.abs(npv) < 1e-6 * scale)
+    if not converged.any():
+        return None
+    roots = rates[converged]
+    return float(roots[np.argmin(np.abs(roots - 0.1))])
+
+
+def returns_report(days: np.ndarray, totals: np.ndarray, flow_days: np.ndarray, flow_amounts: np.ndarray) -> Dict:
+    """Cash-flow-adjusted performance: daily returns, TWR and XIRR (money-weighted return).
+
+    `flow_days`/`flow_amounts` are capital deposits (negative amounts are
+    withdrawals). The time-weighted return chains the flow-adjusted daily returns;
+    the money-weighted return is the XIRR of investing the first total, then each
+    later deposit, against the final total. Percentages are in percent.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    totals = np.asarray(totals, dtype=np.float64)
+    flow_days = np.asarray(flow_days, dtype=np.int64)
+    flow_amounts = np.asarray(flow_amounts, dtype=np.float64)
+    report = {
+        "start_date": _iso(days[0]) if len(days) else None,
+        "end_date": _iso(days[-1]) if len(days) else None,
+        "start_value": _rounded(totals[0]) if len(totals) else None,
+        "end_value": _rounded(totals[-1]) if len(totals) else None,
+        "total_deposited": _rounded(flow_amounts.sum()),
+        "net_flows": 0.0,
+        "profit": None,
+        "time_weighted_return": None,
+        "annualized_time_weighted_return": None,
+        "money_weighted_return": None,
+        "daily_returns": [],
+    }
+    if len(totals) < 2:
+        return report
+
+    within = (flow_days > days[0]) & (flow_days <= days[-1])
+    net_flows = flow_amounts[within].sum()
+    report["net_flows"] = _rounded(net_flows)
+    report["profit"] = _rounded(totals[-1] - totals[0] - net_flows)
+
+    returns = flow_adjusted_returns(days, totals, flow_days, flow_amounts)
+    valid = np.isfinite(returns)
+    time_weighted = np.prod(1 + returns[valid]) - 1
+    report["time_weighted_return"] = _rounded(time_weighted * 100)
+    years = (days[-1] - days[0]) / PERIODS_PER_YEAR
+    if years > 0 and time_weighted > -1:
+        report["annualized_time_weighted_return"] = _rounded(((1 + time_weighted) ** (1 / years) - 1) * 100)
+    report["daily_returns"] = [
+        {"date": day, "return_percentage": value}
+        for day, value in zip(_iso_array(days[1:][valid]), np.round(returns[valid] * 100, 4).tolist())
+    ]
+
+    # Investor's view: pay in the first total and later deposits, receive the final total
+    cash_flow_days = np.concatenate(([days[0]], flow_days[within], [days[-1]]))
+    cash_flows = np.concatenate(([-totals[0]], -flow_amounts[within], [totals[-1]]))
+    money_weighted = xirr(cash_flow_days, cash_flows) if years > 0 else None
+    report["money_weighted_return"] = _rounded(money_weighted * 100) if money_weighted is not None else None
+    return report
+
+
+def attribution_report(
+    days: np.ndarray, balances: np.ndarray, exchange_ids: List[str], starting_balances: np.ndarray
+) -> Dict:
+    """Split the portfolio's PnL into per-exchange contributions.
+
+    `balances` is the dense (entries x exchanges) matrix in chain order, NaN where
+    an entry has no balance for an exchange; `starting_balances` holds one value per
+    column, NaN where none is set. A missing balance counts as zero, so an exchange
+    added or removed mid-history contributes its whole balance on that day and the
+    contributions always add up to the change in total. Percentages are in percent.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if not len(days):
+        return {"start_date": None, "end_date": None, "total_pnl": None, "dates": [], "exchanges": []}
+
+    present = ~np.isnan(balances)
+    filled = np.where(present, balances, 0.0)
+    daily = np.vstack((np.zeros((1, filled.shape[1])), np.diff(filled, axis=0)))
+    cumulative = np.cumsum(daily, axis=0)
+    contribution = cumulative[-1]
+    current = filled[-1]
+    total_pnl = contribution.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = contribution / total_pnl * 100 if total_pnl != 0 else np.full(len(contribution), np.nan)
+        roi = np.where(starting_balances > 0, (current - starting_balances) / starting_balances * 100, np.nan)
+    # First and last row holding a balance per column (argmax finds the first True)
+    seen = present.any(axis=0)
+    first_seen = np.argmax(present, axis=0)
+    last_seen = len(days) - 1 - np.argmax(present[::-1], axis=0)
+
+    exchanges = []
+    for column, exchange_id in enumerate(exchange_ids):
+        exchanges.append(
+            {
+                "exchange_id": exchange_id,
+                "first_date": _iso(days[first_seen[column]]) if seen[column] else None,
+                "last_date": _iso(days[last_seen[column]]) if seen[column] else None,
+                "current_balance": _rounded(current[column]),
+                "starting_balance": _rounded(starting_balances[column]),
+                "contribution": _rounded(contribution[column]),
+                "share_of_return": _rounded(share[column]),
+                "roi": _rounded(roi[column]),
+                "daily_contribution": np.round(daily[:, column], 2).tolist(),
+                "cumulative_contribution": np.round(cumulative[:, column], 2).tolist(),
+            }
+        )
+    return {
+        "start_date": _iso(days[0]),
+        "end_date": _iso(days[-1]),
+        "total_pnl": _rounded(total_pnl),
+        "dates": _iso_array(days),
+        "exchanges": exchanges,
+    }
@@ -0,0 +1,142 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+
+def balance_matrix(entries: List[Dict], column_index: Dict[str, int]) -> np.ndarray:
+    """Dense (entries x exchanges) balance matrix; NaN where an entry has no balance for an exchange"""
+    rows, columns, amounts = [], [], []
+    for row, entry in enumerate(entries):
+        for balance in entry["balances"]:
+            column = column_index.get(balance["exchange_id"])
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                amounts.append(balance["amount"])
+
+    matrix = np.full((len(entries), len(column_index)), np.nan)
+    matrix[np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)] = amounts
+    return matrix
+
+
+def exchange_column_names(exchange_names: List[str]) -> List[str]:
+    """One column name per exchange: `balance_<name>`, with a numeric suffix for repeats.
+
+    The prefix keeps an exchange called `date` or `total` from clashing with the
+    fixed columns, and the suffix keeps two exchanges with the same name apart.
+    """
+    columns, taken = [], set()
+    for name in exchange_names:
+        column, repeat = f"balance_{name}", 1
+        while column in taken:
+            repeat += 1
+            column = f"balance_{name}_{repeat}"
+        taken.add(column)
+        columns.append(column)
+    return columns
+
+
+def entries_schema(exchange_names: List[str]) -> pa.Schema:
+    return pa.schema(
+        [pa.field("date", pa.date32())]
+        + [pa.field(column, pa.float64()) for column in exchange_column_names(exchange_names)]
+        + [
+            pa.field("total", pa.float64()),
+            pa.field("pnl_amount", pa.float64()),
+            pa.field("pnl_percentage", pa.float64()),
+        ]
+    )
+
+
+def entries_record_batch(entries: List[Dict], column_index: Dict[str, int], schema: pa.Schema) -> pa.RecordBatch:
+    """One typed record batch from a batch of entry documents (dates as datetime.date)"""
+    balances = balance_matrix(entries, column_index)
+    arrays = [pa.array([entry["date"] for entry in entries], type=pa.date32())]
+    arrays.extend(
+        pa.array(balances[:, column], mask=np.isnan(balances[:, column])) for column in range(balances.shape[1])
+    )
+    for field in ("total", "pnl_amount", "pnl_percentage"):
+        arrays.append(pa.array(np.fromiter((entry[field] for entry in entries), dtype=np.float64, count=len(entries))))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ColumnarWriter:
+    """Writes record batches as a Parquet (one row group per batch) or Arrow IPC file,
+    returning the bytes each step produced so the file can be streamed while it is built"""
+
+    def __init__(self, export_format: str, schema: pa.Schema):
+        self._sink = _ChunkSink()
+        if export_format == "parquet":
+            self._writer = pq.ParquetWriter(self._sink, schema, compression="zstd")
+        elif export_format == "arrow":
+            self._writer = ipc.new_file(self._sink, schema)
+        else:
+            raise ValueError(f"Unknown columnar format: {export_format}")
+
+    def header(self) -> bytes:
+        return self._sink.take()
+
+    def write_batch(self, batch: pa.RecordBatch) -> bytes:
+        self._writer.write_batch(batch)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        """Finish the file; returns the footer"""
+        self._writer.close()
+        return self._sink.take()
+
+
+def write_columnar(export_format: str, batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> bytes:
+    """A whole Parquet or Arrow IPC file in memory"""
+    writer = ColumnarWriter(export_format, schema)
+    chunks = [writer.header()]
+    chunks.extend(writer.write_batch(batch) for batch in batches)
+    chunks.append(writer.close())
+    return b"".join(chunks)
+
+
+def write_parquet(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> bytes:
+    """Write batches as Parquet row groups"""
+    return write_columnar("parquet", batches, schema)
+
+
+def write_arrow(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> bytes:
+    """Write batches as an Arrow IPC file (Feather v2)"""
+    return write_columnar("arrow", batches, schema)
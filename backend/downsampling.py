@@ -0,0 +1,68 @@
+from typing import Iterable
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int, keep: Iterable[int] = ()) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of at most `max_points` points that keep the series' shape.
+
+    The first and last points are always kept. Interior points are split into
+    buckets and each bucket keeps the point that forms the largest triangle with
+    the previously kept point and the next bucket's average. Every index in `keep`
+    is added to the result outright, so known peaks and troughs never drop out even
+    when several share a bucket; the buckets are cut down to leave room for them.
+    If `max_points` can't even hold the endpoints and `keep`, just those are returned.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    kept = sorted({int(index) for index in keep if 1 <= index <= n - 2})
+    bucket_count = max_points - 2 - len(kept)
+    if bucket_count < 1:
+        return np.array([0, *kept, n - 1], dtype=np.intp)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i covers [edges[i], edges[i + 1]) of the interior points 1..n-2; each holds at least one point
+    edges = np.linspace(1, n - 1, bucket_count + 1).astype(np.intp)
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x[: n - 1], edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y[: n - 1], edges[:-1]) / sizes
+    # Third triangle vertex: the next bucket's average, or the last point for the final bucket
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    # A bucket holding kept indices is represented by its last one, which anchors the next bucket's triangles
+    forced = np.full(bucket_count, -1, dtype=np.intp)
+    for index in kept:
+        forced[np.searchsorted(edges, index, side="right") - 1] = index
+
+    selected = np.empty(bucket_count + 2, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(bucket_count):
+        if forced[bucket] >= 0:
+            anchor = forced[bucket]
+        else:
+            lo, hi = edges[bucket], edges[bucket + 1]
+            areas = np.abs(
+                (x[anchor] - next_x[bucket]) * (y[lo:hi] - y[anchor])
+                - (x[anchor] - x[lo:hi]) * (next_y[bucket] - y[anchor])
+            )
+            anchor = lo + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    if kept:
+        selected = np.union1d(selected, kept)
+    return selected
+
+
+def extreme_indices(y: np.ndarray) -> list:
+    """Indices of the global low and high plus the peak and trough of the deepest drawdown"""
+    if len(y) == 0:
+        return []
+    y = np.asarray(y, dtype=np.float64)
+    trough = int(np.argmin(y - np.maximum.accumulate(y)))
+    peak = int(np.argmax(y[: trough + 1]))
+    return [int(np.argmin(y)), int(np.argmax(y)), peak, trough]
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Dict, Set
+
+from json_response import dumps
+
+# Sent instead of a subscriber's backlog once it falls too far behind
+RESYNC_EVENT = {"type": "resync"}
+
+
+class EventBroker:
+    """In-process pub/sub of per-user events for the /events stream.
+
+    Every subscriber gets a bounded queue and publishing never waits. A subscriber
+    whose queue is full loses its backlog and gets a single resync event instead,
+    telling the client to refetch, so a slow client can't hold up writers or grow
+    memory without bound. Single node only; meant to be used from the event loop.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.published = 0
+        self.resyncs = 0
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id: str) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, user_id: str, event: Dict[str, Any]) -> int:
+        """Queue an event for each of the user's subscribers; returns how many got it"""
+        queues = self._subscribers.get(user_id, ())
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_EVENT)
+                self.resyncs += 1
+        self.published += 1
+        return len(queues)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    """One server-sent event carrying the event as JSON"""
+    return b"data: " + dumps(event) + b"\n\n"
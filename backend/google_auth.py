@@ -0,0 +1,105 @@
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+from google.auth import jwt
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+# Used when the certs response carries no usable max-age
+DEFAULT_CERTS_TTL_SECONDS = 300
+# Unknown key ids trigger at most one early refresh per this many seconds
+MIN_FORCED_REFRESH_INTERVAL_SECONDS = 60
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Extract max-age (seconds) from a Cache-Control header"""
+    if not cache_control or "no-store" in cache_control or "no-cache" in cache_control:
+        return None
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens against a cached copy of Google's signing certs.
+
+    The certs are refreshed when the max-age from their last response runs out, or
+    early when a token is signed with a key id we haven't seen (key rotation). Early
+    refreshes happen at most once per `min_refresh_interval` seconds, so tokens with
+    made-up key ids can't make us hammer Google or stall logins behind the lock.
+    `verify` runs signature checking and any cert download on a small thread pool
+    so it never blocks the event loop. `certs_url` can point at a local stand-in.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        certs_url: str = GOOGLE_CERTS_URL,
+        max_workers: int = 4,
+        timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        min_refresh_interval: float = MIN_FORCED_REFRESH_INTERVAL_SECONDS,
+    ):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.timeout = timeout
+        self.clock = clock
+        self.min_refresh_interval = min_refresh_interval
+        self.cert_fetches = 0
+        self._certs: Optional[Dict[str, str]] = None
+        self._certs_expire_at = 0.0
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="google-auth")
+
+    def _fetch_certs(self) -> None:
+        response = self._http.get(self.certs_url, timeout=self.timeout)
+        response.raise_for_status()
+        self.cert_fetches += 1
+        max_age = parse_max_age(response.headers.get("Cache-Control"))
+        self._certs = response.json()
+        self._fetched_at = self.clock()
+        self._certs_expire_at = self._fetched_at + (max_age if max_age is not None else DEFAULT_CERTS_TTL_SECONDS)
+
+    def get_certs(self, force_refresh: bool = False) -> Dict[str, str]:
+        """Return the signing certs, downloading them only when the cached copy is stale.
+
+        `force_refresh` downloads early unless the certs were fetched within the
+        last `min_refresh_interval` seconds.
+        """
+        with self._lock:
+            if self._certs is None or self.clock() >= self._certs_expire_at:
+                self._fetch_certs()
+            elif force_refresh and self.clock() - self._fetched_at >= self.min_refresh_interval:
+                self._fetch_certs()
+            return self._certs
+
+    def verify_sync(self, token: str) -> Dict:
+        """Verify a token's signature, audience and issuer; raises ValueError if invalid"""
+        certs = self.get_certs()
+        key_id = jwt.decode_header(token).get("kid")
+        if key_id and key_id not in certs:
+            certs = self.get_certs(force_refresh=True)
+            if key_id not in certs:
+                raise ValueError(f"Unknown key id {key_id}")
+
+        idinfo = jwt.decode(token, certs=certs, audience=self.client_id)
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}")
+        return idinfo
+
+    async def verify(self, token: str) -> Dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.verify_sync, token)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._http.close()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent requests so an outage can't multiply load.
+
+    Every request deposits `ratio` tokens (up to `max_tokens`); every retry spends one.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10, max_tokens: float = 100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(min_tokens)
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class HttpClient:
+    """Application-lifetime outbound HTTP client.
+
+    Wraps one pooled aiohttp.ClientSession with per-host connection limits,
+    timeouts and budgeted retries of idempotent requests. Create it on startup
+    with `start()` and release it on shutdown with `close()`.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        total_timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_budget = retry_budget or RetryBudget()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HttpClient is not started")
+        return self._session
+
+    async def request_json(self, method: str, url: str, **kwargs) -> Tuple[int, Any]:
+        """Send a request and return (status, decoded JSON body or None)"""
+        method = method.upper()
+        retryable = method in IDEMPOTENT_METHODS
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if not (retryable and response.status in RETRYABLE_STATUSES and self._may_retry(attempt)):
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError:
+                            data = None
+                        return response.status, data
+                    logger.warning(f"{method} {url} returned {response.status}, retrying")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not (retryable and self._may_retry(attempt)):
+                    raise
+                logger.warning(f"{method} {url} failed ({e!r}), retrying")
+
+            attempt += 1
+            await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+    def _may_retry(self, attempt: int) -> bool:
+        return attempt < self.max_retries and self.retry_budget.try_spend()
+
+    async def get_json(self, url: str, **kwargs) -> Tuple[int, Any]:
+        return await self.request_json("GET", url, **kwargs)
@@ -0,0 +1,177 @@
+"""
+Declarative MongoDB indexes for every hot query, built idempotently on startup.
+
+QUERY_SHAPES lists representative queries from the API routes; check_query_plans
+explains each one and reports any that would fall back to a collection scan.
+tests/test_indexes.py records the filters the routes really send and checks that
+each one has a shape here, so the list can't silently drift from the code.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+    ],
+    "pnl_entries": [
+        # Chain order is (date, id) within a user
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)], name="user_date_id"),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Multikey: "is this exchange used in any entry?"
+        IndexModel([("user_id", ASCENDING), ("balances.exchange_id", ASCENDING)], name="user_balances_exchange"),
+    ],
+    "exchanges": [
+        IndexModel([("user_id", ASCENDING), ("name", ASCENDING)], name="user_name"),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "kpis": [
+        IndexModel(
+            [("user_id", ASCENDING), ("is_active", ASCENDING), ("target_amount", ASCENDING)], name="user_active_target"
+        ),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "capital_deposits": [
+        IndexModel([("user_id", ASCENDING), ("deposit_date", ASCENDING)], name="user_deposit_date"),
+        IndexModel([("id", ASCENDING)], name="id"),
+    ],
+    "exchange_starting_balances": [
+        IndexModel([("user_id", ASCENDING), ("exchange_id", ASCENDING)], name="user_exchange"),
+    ],
+    "pnl_monthly_rollups": [
+        IndexModel(
+            [("user_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)],
+            name="user_year_month_unique",
+            unique=True,
+        ),
+    ],
+    "data_versions": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+}
+
+# (collection, filter, sort) for the queries the API routes issue
+QUERY_SHAPES = [
+    ("user_sessions", {"session_token": "t", "expires_at": {"$gt": datetime(2024, 1, 1)}}, None),
+    ("user_sessions", {"session_token": "t"}, None),
+    ("users", {"id": "u"}, None),
+    ("users", {"email": "e"}, None),
+    ("pnl_entries", {"user_id": "u"}, [("date", DESCENDING)]),
+    ("pnl_entries", {"user_id": "u", "date": {"$gte": datetime(2024, 1, 1)}}, [("date", ASCENDING), ("id", ASCENDING)]),
+    (
+        "pnl_entries",
+        {
+            "user_id": "u",
+            "$or": [{"date": {"$lt": datetime(2024, 1, 1)}}, {"date": datetime(2024, 1, 1), "id": {"$lt": "e"}}],
+        },
+        [("date", DESCENDING), ("id", DESCENDING)],
+    ),
+    (
+        "pnl_entries",
+        {
+            "user_id": "u",
+            "date": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 12, 31)},
+            "$or": [{"date": {"$gt": datetime(2024, 1, 1)}}, {"date": datetime(2024, 1, 1), "id": {"$gt": "e"}}],
+        },
+        [("date", ASCENDING), ("id", ASCENDING)],
+    ),
+    ("pnl_entries", {"id": "e", "user_id": "u"}, None),
+    # save_chain_updates only writes entries still holding the values it read
+    ("pnl_entries", {"id": "e", "user_id": "u", "total": 1.0, "pnl_amount": 0.0, "pnl_percentage": 0.0}, None),
+    ("pnl_entries", {"user_id": "u", "balances.exchange_id": "x"}, None),
+    # get_monthly_rollups checks for trading days before rebuilding missing rollups
+    ("pnl_entries", {"user_id": "u", "pnl_percentage": {"$ne": 0}}, None),
+    ("exchanges", {"user_id": "u"}, [("name", ASCENDING)]),
+    ("exchanges", {"user_id": "u", "is_active": True}, [("name", ASCENDING)]),
+    ("exchanges", {"user_id": "u", "name": "kraken"}, None),
+    ("exchanges", {"id": "x", "user_id": "u"}, None),
+    ("kpis", {"user_id": "u"}, None),
+    ("kpis", {"user_id": "u", "target_amount": 5000}, None),
+    ("kpis", {"user_id": "u", "is_active": True}, [("target_amount", ASCENDING)]),
+    ("kpis", {"id": "k", "user_id": "u"}, None),
+    ("capital_deposits", {"user_id": "u"}, [("deposit_date", DESCENDING)]),
+    ("capital_deposits", {"user_id": "u", "id": "d"}, None),
+    ("exchange_starting_balances", {"user_id": "u"}, None),
+    ("exchange_starting_balances", {"user_id": "u", "exchange_id": "x"}, None),
+    (
+        "pnl_monthly_rollups",
+        {"user_id": "u", "trading_days": {"$gt": 0}},
+        [("year", DESCENDING), ("month", DESCENDING)],
+    ),
+    ("pnl_monthly_rollups", {"user_id": "u", "year": 2024, "month": 1}, None),
+    ("data_versions", {"user_id": "u"}, None),
+]
+
+
+def unique_keys(collection: str) -> List[List[str]]:
+    """Field lists of the collection's declared unique indexes"""
+    return [list(index.document["key"]) for index in INDEXES.get(collection, []) if index.document.get("unique")]
+
+
+def query_fields(query: Dict) -> Tuple[str, ...]:
+    """Sorted field names a filter constrains, including those inside $or/$and/$nor branches"""
+    fields = set()
+    for key, value in query.items():
+        if key in ("$or", "$and", "$nor"):
+            for branch in value:
+                fields.update(query_fields(branch))
+        else:
+            fields.add(key)
+    return tuple(sorted(fields))
+
+
+async def ensure_indexes(db) -> None:
+    """Create all declared indexes; existing identical indexes are a no-op.
+
+    A unique index that can't be built because of duplicate keys stops startup:
+    without it the code's one-document-per-key assumption silently breaks. Run
+    `python manage.py dedupe` to remove the duplicates. Other failures are logged.
+    """
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            if e.code == DUPLICATE_KEY_ERROR:
+                raise RuntimeError(
+                    f"Duplicate keys in {collection} block a unique index; run `python manage.py dedupe`: {e}"
+                ) from e
+            logger.error(f"Could not build indexes for {collection}: {e}")
+
+
+def find_collection_scans(plan: Dict) -> List[Dict]:
+    """Return every COLLSCAN stage in an explain() plan tree"""
+    scans = []
+    if plan.get("stage") == "COLLSCAN":
+        scans.append(plan)
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            scans.extend(find_collection_scans(plan[key]))
+    for child in plan.get("inputStages", []):
+        scans.extend(find_collection_scans(child))
+    return scans
+
+
+async def check_query_plans(db) -> List[str]:
+    """Explain every query in QUERY_SHAPES and describe the ones that scan a collection"""
+    problems = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        if find_collection_scans(winning_plan):
+            problems.append(f"{collection}: {query} sort={sort} uses a collection scan")
+    return problems
@@ -0,0 +1,35 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson doesn't encode natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content to JSON bytes the way FastJSONResponse does"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson.
+
+    datetime, date, UUID and numpy values are encoded natively by orjson in C, with
+    the same ISO 8601 text jsonable_encoder produces for naive datetimes. Routes
+    returning large lists hand their content to this class directly to skip
+    FastAPI's jsonable_encoder pass as well.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
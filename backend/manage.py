@@ -0,0 +1,192 @@
+"""
+Maintenance commands for the Crypto PnL Tracker database.
+
+Run from the backend directory, e.g. `python manage.py strip-kpi-progress`.
+"""
+
+import asyncio
+
+import typer
+from pymongo import UpdateOne
+
+from indexes import INDEXES, check_query_plans, ensure_indexes, unique_keys
+from server import client, db, from_db_date, rebuild_monthly_rollups, recalculate_chain, to_db_date
+
+cli = typer.Typer(help="Crypto PnL Tracker maintenance commands")
+
+
+@cli.callback()
+def main():
+    """Crypto PnL Tracker maintenance commands"""
+
+
+def run(coro):
+    """Run a coroutine to completion and release the Mongo client"""
+    try:
+        return asyncio.run(coro)
+    finally:
+        client.close()
+
+
+@cli.command("strip-kpi-progress")
+def strip_kpi_progress():
+    """Remove stored kpi_progress arrays; KPI progress is now derived at read time"""
+
+    async def _strip():
+        result = await db.pnl_entries.update_many({"kpi_progress": {"$exists": True}}, {"$unset": {"kpi_progress": ""}})
+        return result.modified_count
+
+    modified = run(_strip())
+    typer.echo(f"Removed kpi_progress from {modified} entries")
+
+
+@cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Build every index declared in indexes.py"""
+    run(ensure_indexes(db))
+    typer.echo("Indexes are up to date")
+
+
+@cli.command("check-query-plans")
+def check_query_plans_command():
+    """Fail if any hot query would use a collection scan"""
+
+    async def _check():
+        await ensure_indexes(db)
+        return await check_query_plans(db)
+
+    problems = run(_check())
+    for problem in problems:
+        typer.echo(problem, err=True)
+    if problems:
+        raise typer.Exit(code=1)
+    typer.echo("All query shapes use an index")
+
+
+@cli.command("rebuild-rollups")
+def rebuild_rollups(user_id: str = typer.Option(None, help="Only rebuild this user's rollups")):
+    """Backfill pnl_monthly_rollups from pnl_entries.
+
+    Reads rebuild a user's missing rollups on their own; this fills them ahead of
+    time and resets any float drift in the stored sums.
+    """
+
+    async def _rebuild():
+        user_ids = [user_id] if user_id else await db.pnl_entries.distinct("user_id")
+        for uid in user_ids:
+            months = await rebuild_monthly_rollups(uid)
+            typer.echo(f"{uid}: {months} months")
+        return len(user_ids)
+
+    users = run(_rebuild())
+    typer.echo(f"Rebuilt monthly rollups for {users} users")
+
+
+async def remove_duplicate_keys(echo=typer.echo) -> int:
+    """Delete documents that repeat a declared unique index's key, keeping the oldest.
+
+    Unique indexes can't be built over duplicates, and startup refuses to run
+    without them. Users who lost a duplicate entry or rollup get their chain
+    recalculated and their rollups rebuilt. Returns the number of documents removed.
+    """
+    removed = 0
+    repair_user_ids = set()
+    for collection in INDEXES:
+        for fields in unique_keys(collection):
+            duplicates = (
+                await db[collection]
+                .aggregate(
+                    [
+                        {"$sort": {"_id": 1}},
+                        {
+                            "$group": {
+                                "_id": {field: f"${field}" for field in fields},
+                                "ids": {"$push": "$_id"},
+                                "user_ids": {"$addToSet": "$user_id"},
+                                "count": {"$sum": 1},
+                            }
+                        },
+                        {"$match": {"count": {"$gt": 1}}},
+                    ]
+                )
+                .to_list(None)
+            )
+            if not duplicates:
+                continue
+            extra = [document_id for group in duplicates for document_id in group["ids"][1:]]
+            result = await db[collection].delete_many({"_id": {"$in": extra}})
+            removed += result.deleted_count
+            echo(f"{collection}: removed {result.deleted_count} duplicates of {', '.join(fields)}")
+            if collection in ("pnl_entries", "pnl_monthly_rollups"):
+                repair_user_ids.update(user_id for group in duplicates for user_id in group["user_ids"] if user_id)
+
+    for uid in sorted(repair_user_ids):
+        report = await recalculate_chain(uid)
+        months = await rebuild_monthly_rollups(uid)
+        echo(f"{uid}: {report.modified} entries recalculated, {months} months rebuilt")
+    return removed
+
+
+@cli.command("dedupe")
+def dedupe():
+    """Remove documents that would block the unique indexes, then build the indexes"""
+
+    async def _dedupe():
+        removed = await remove_duplicate_keys()
+        await ensure_indexes(db)
+        return removed
+
+    removed = run(_dedupe())
+    typer.echo(f"Removed {removed} duplicate documents; indexes are up to date")
+
+
+async def migrate_entry_dates(batch_size: int = 1000, echo=typer.echo) -> tuple:
+    """Convert string entry dates to BSON dates, then repair the affected users.
+
+    Until an entry is converted, the write path's BSON date range queries can't see
+    it, so writes made during the migration may have computed PnL against the wrong
+    neighbours. Every user who had string dates gets a full chain recalculation
+    and a rollup rebuild once all their entries are converted.
+    Returns (entries converted, users repaired).
+    """
+    migrated = 0
+    user_ids = set()
+    while True:
+        batch = (
+            await db.pnl_entries.find({"date": {"$type": "string"}}, {"_id": 1, "user_id": 1, "date": 1})
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not batch:
+            break
+        # Matching on the old value leaves entries edited meanwhile alone
+        result = await db.pnl_entries.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": entry["_id"], "date": entry["date"]},
+                    {"$set": {"date": to_db_date(from_db_date(entry["date"]))}},
+                )
+                for entry in batch
+            ],
+            ordered=False,
+        )
+        migrated += result.modified_count
+        user_ids.update(entry["user_id"] for entry in batch)
+        echo(f"Converted {migrated} entries")
+
+    for uid in sorted(user_ids):
+        report = await recalculate_chain(uid)
+        months = await rebuild_monthly_rollups(uid)
+        echo(f"{uid}: {report.modified} entries recalculated, {months} months rebuilt")
+    return migrated, len(user_ids)
+
+
+@cli.command("migrate-dates")
+def migrate_dates(batch_size: int = typer.Option(1000, help="Entries converted per bulk write")):
+    """Convert pnl_entries.date from ISO strings to BSON dates, in batches, while the app runs"""
+    migrated, users = run(migrate_entry_dates(batch_size))
+    typer.echo(f"Done: {migrated} entry dates converted, {users} users recalculated")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional, Tuple
+
+
+def calculate_pnl_metrics(current_total: float, previous_total: float) -> Dict[str, float]:
+    """Calculate PnL percentage and amount"""
+    if previous_total == 0:
+        return {"pnl_percentage": 0.0, "pnl_amount": 0.0}
+
+    pnl_amount = current_total - previous_total
+    pnl_percentage = (pnl_amount / previous_total) * 100
+
+    return {"pnl_percentage": round(pnl_percentage, 2), "pnl_amount": round(pnl_amount, 2)}
+
+
+def calculate_kpi_progress(current_total: float, user_kpis: List[Dict]) -> List[Dict]:
+    """Calculate progress towards dynamic KPI goals"""
+    kpi_progress = []
+    for kpi in user_kpis:
+        progress = current_total - kpi["target_amount"]
+        kpi_progress.append({"kpi_id": kpi["id"], "progress": round(progress, 2)})
+    return kpi_progress
+
+
+def entry_total(balances: List[Dict]) -> float:
+    """Sum an entry's exchange balances the way it is stored"""
+    return round(sum(balance["amount"] for balance in balances), 2)
+
+
+def compute_chain_updates(entries: List[Dict], previous_total: Optional[float] = None) -> List[Dict]:
+    """Recompute total and PnL along a date-ordered chain of entries.
+
+    `previous_total` is the stored total of the entry just before the chain, or None
+    when the chain starts at the user's first entry. Returns one
+    {"id": ..., "set": {...}} item per entry whose stored values actually changed.
+    """
+    updates = []
+    for entry in entries:
+        current_total = entry_total(entry["balances"])
+        if previous_total is None:
+            previous_total = current_total  # First entry has no previous
+
+        new_values = {"total": current_total, **calculate_pnl_metrics(current_total, previous_total)}
+
+        if any(entry.get(field) != value for field, value in new_values.items()):
+            updates.append({"id": entry["id"], "set": new_values})
+
+        previous_total = current_total
+    return updates
+
+
+def rollup_month(entry_date) -> Tuple[int, int]:
+    """(year, month) of an entry date stored as an ISO string or date"""
+    if isinstance(entry_date, str):
+        return int(entry_date[:4]), int(entry_date[5:7])
+    return entry_date.year, entry_date.month
+
+
+def rollup_deltas(before: List[Dict], after: List[Dict]) -> Dict[Tuple[int, int], Dict[str, float]]:
+    """Change in monthly rollup sums when entries go from `before` to `after`.
+
+    Only entries with a non-zero pnl_percentage count as trading days, matching the
+    monthly performance report. Months whose sums don't change are left out.
+    """
+    deltas: Dict[Tuple[int, int], Dict[str, float]] = {}
+    for sign, entries in ((-1, before), (1, after)):
+        for entry in entries:
+            if not entry.get("pnl_percentage"):
+                continue
+            delta = deltas.setdefault(
+                rollup_month(entry["date"]), {"pnl_percentage_sum": 0.0, "pnl_amount_sum": 0.0, "trading_days": 0}
+            )
+            delta["pnl_percentage_sum"] += sign * entry["pnl_percentage"]
+            delta["pnl_amount_sum"] += sign * entry["pnl_amount"]
+            delta["trading_days"] += sign
+    return {
+        month: delta
+        for month, delta in deltas.items()
+        if delta["trading_days"] or abs(delta["pnl_percentage_sum"]) > 1e-9 or abs(delta["pnl_amount_sum"]) > 1e-9
+    }
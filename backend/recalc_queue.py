@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _earliest(first: Optional[date], second: Optional[date]) -> Optional[date]:
+    """The earlier start date; None stands for the whole chain"""
+    if first is None or second is None:
+        return None
+    return min(first, second)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _Job:
+    __slots__ = ("from_date", "queued_at", "done")
+
+    def __init__(self, from_date: Optional[date]):
+        self.from_date = from_date
+        self.queued_at = time.monotonic()
+        self.done = asyncio.Event()
+
+
+class RecalculationQueue:
+    """Background chain recalculations, coalesced per user.
+
+    A submission for a user who already has a job waiting merges into it, starting
+    from the earlier date, and jobs wait `debounce` seconds after their first
+    submission before running, so a burst of writes becomes one recalculation. A
+    user never has two jobs running at once: one submitted mid-run queues behind
+    it. Without started workers (outside the app's lifespan) submissions run inline.
+    """
+
+    def __init__(
+        self,
+        recalculate: Callable[[str, Optional[date]], Awaitable[Any]],
+        debounce: float = 0.25,
+        workers: int = 2,
+        latency_samples: int = 1000,
+    ):
+        self.recalculate = recalculate
+        self.debounce = debounce
+        self.worker_count = workers
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        # Seconds from a job's first submission until it finished, most recent last
+        self._latencies: deque = deque(maxlen=latency_samples)
+        self._pending: Dict[str, _Job] = {}
+        self._running: Dict[str, _Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Set by drain to cut short the workers' debounce waits
+        self._draining: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        """Start the workers on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._draining = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def submit(self, user_id: str, from_date: Optional[date] = None) -> None:
+        """Recalculate the user's chain from `from_date` (None for all of it) in the background"""
+        self.submitted += 1
+        if not self._workers:
+            await self.recalculate(user_id, from_date)
+            return
+
+        job = self._pending.get(user_id)
+        if job is not None:
+            job.from_date = _earliest(job.from_date, from_date)
+            self.coalesced += 1
+            return
+        self._pending[user_id] = _Job(from_date)
+        if user_id not in self._running:
+            self._queue.put_nowait(user_id)
+
+    async def wait(self, user_id: str) -> None:
+        """Wait until the user's waiting and running recalculations are done"""
+        # A waiting job only runs after the running one, so it finishes last
+        job = self._pending.get(user_id) or self._running.get(user_id)
+        if job is not None:
+            await job.done.wait()
+
+    async def drain(self, timeout: float = 30.0) -> None:
+        """Run what is queued without debouncing (for up to `timeout` seconds), then stop the workers"""
+        if not self._workers:
+            return
+        self._draining.set()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Recalculation queue drain timed out with {len(self._pending) + len(self._running)} jobs left"
+            )
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Nothing will run the leftovers; don't leave readers waiting on them
+        for job in [*self._pending.values(), *self._running.values()]:
+            job.done.set()
+        self._pending.clear()
+        self._running.clear()
+
+    async def _work(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                job = self._pending[user_id]
+                delay = job.queued_at + self.debounce - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._draining.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                await self._run(user_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, user_id: str) -> None:
+        job = self._pending.pop(user_id)
+        self._running[user_id] = job
+        try:
+            await self.recalculate(user_id, job.from_date)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Recalculation for user {user_id} failed")
+        finally:
+            del self._running[user_id]
+            self._latencies.append(time.monotonic() - job.queued_at)
+            job.done.set()
+            if user_id in self._pending:
+                self._queue.put_nowait(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "workers": len(self._workers),
+            "depth": len(self._pending),
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_ms": (
+                {
+                    "p50": round(_percentile(latencies, 0.5) * 1000, 2),
+                    "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+                    "max": round(latencies[-1] * 1000, 2),
+                }
+                if latencies
+                else None
+            ),
+        }
@@ -1,22 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, UploadFile, File
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Hashable, Sequence
 import uuid
+import time
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import csv
 import io
-import aiohttp
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import calendar
+import base64
+import hashlib
+import numpy as np
+from pnl_engine import calculate_pnl_metrics, calculate_kpi_progress, compute_chain_updates, rollup_deltas, entry_total
+from cache import TTLCache
+from google_auth import GoogleTokenVerifier, GOOGLE_CERTS_URL
+from http_client import HttpClient
+from indexes import ensure_indexes
+from downsampling import lttb_indices, extreme_indices
+from json_response import FastJSONResponse
+from analytics import attribution_report, risk_metrics, returns_report
+from columnar import ColumnarWriter, balance_matrix, entries_schema, entries_record_batch
+from events import EventBroker, format_sse
+from recalc_queue import RecalculationQueue
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -27,7 +43,7 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create a router without prefix
 api_router = APIRouter()
@@ -35,6 +51,45 @@ api_router = APIRouter()
 # Security
 security = HTTPBearer(auto_error=False)
 
+# Shared outbound HTTP client (started/closed with the app)
+http_client = HttpClient(
+    limit=int(os.environ.get('HTTP_POOL_SIZE', 100)),
+    limit_per_host=int(os.environ.get('HTTP_POOL_SIZE_PER_HOST', 20)),
+    total_timeout=float(os.environ.get('HTTP_TIMEOUT_SECONDS', 10))
+)
+
+# Google ID token verification with cached signing certs
+google_verifier = GoogleTokenVerifier(
+    client_id=os.environ.get('GOOGLE_CLIENT_ID', 'your-google-client-id.apps.googleusercontent.com'),
+    certs_url=os.environ.get('GOOGLE_CERTS_URL', GOOGLE_CERTS_URL)
+)
+
+# Resolved sessions keyed by session token, so authenticated requests skip Mongo
+session_cache = TTLCache(
+    maxsize=int(os.environ.get('SESSION_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL_SECONDS', 60))
+)
+
+# Analytics results keyed by (report, user, data version); a write moves the version on
+analytics_cache = TTLCache(
+    maxsize=int(os.environ.get('ANALYTICS_CACHE_SIZE', 512)),
+    ttl=float(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', 3600))
+)
+
+# Per-user /events subscribers; each one buffers at most EVENTS_QUEUE_SIZE events
+event_broker = EventBroker(queue_size=int(os.environ.get('EVENTS_QUEUE_SIZE', 100)))
+# Idle /events streams send a comment this often to keep proxies from closing them
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('EVENTS_KEEPALIVE_SECONDS', 15))
+
+# Full-chain recalculations run in the background, coalesced per user; see run_recalculation
+recalculation_queue = RecalculationQueue(
+    lambda user_id, from_date: run_recalculation(user_id, from_date),
+    debounce=float(os.environ.get('RECALC_DEBOUNCE_SECONDS', 0.25)),
+    workers=int(os.environ.get('RECALC_WORKERS', 2))
+)
+# How long shutdown waits for queued recalculations to finish
+RECALC_DRAIN_TIMEOUT_SECONDS = float(os.environ.get('RECALC_DRAIN_TIMEOUT_SECONDS', 30))
+
 # Pydantic Models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -97,7 +152,7 @@ class CapitalDeposit(BaseModel):
 
 class CapitalDepositCreate(BaseModel):
     amount: float
-    deposit_date: str
+    deposit_date: date
     notes: Optional[str] = ""
 
 class ExchangeStartingBalanceCreate(BaseModel):
@@ -125,8 +180,11 @@ class PnLEntryCreate(BaseModel):
     balances: List[DynamicBalance]
     notes: Optional[str] = ""
 
+# Alias so the optional `date` field below doesn't shadow its own annotation
+EntryDate = date
+
 class PnLEntryUpdate(BaseModel):
-    date: Optional[date] = None
+    date: Optional[EntryDate] = None
     balances: Optional[List[DynamicBalance]] = None
     notes: Optional[str] = None
 
@@ -145,6 +203,13 @@ async def get_current_user(request: Request, credentials: HTTPAuthorizationCrede
     if not session_token:
         return None
     
+    cached = session_cache.get(session_token)
+    if cached:
+        user, expires_at = cached
+        if expires_at > datetime.utcnow():
+            return user
+        session_cache.invalidate(session_token)
+    
     try:
         # Find session in database
         session = await db.user_sessions.find_one({
@@ -160,41 +225,101 @@ async def get_current_user(request: Request, credentials: HTTPAuthorizationCrede
         if not user:
             return None
         
-        return User(**user)
+        user = User(**user)
+        session_cache.set(
+            session_token,
+            (user, session["expires_at"]),
+            ttl=(session["expires_at"] - datetime.utcnow()).total_seconds()
+        )
+        return user
     except Exception as e:
         logger.error(f"Error getting current user: {e}")
         return None
 
+def to_db_date(value: date) -> datetime:
+    """Entry dates are stored as BSON dates at UTC midnight"""
+    return datetime(value.year, value.month, value.day)
+
+def from_db_date(value) -> date:
+    """Read back an entry date stored as a BSON date or, before migration, an ISO string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+async def get_active_kpis(user_id: str) -> List[Dict]:
+    """Get the user's active KPIs, used to derive KPI progress at read time"""
+    return await db.kpis.find({
+        "user_id": user_id,
+        "is_active": True
+    }).sort("target_amount", 1).to_list(100)
+
+async def get_data_version(user_id: str) -> int:
+    """The user's data version; 0 until their first write"""
+    doc = await db.data_versions.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    return doc["version"] if doc else 0
+
+async def bump_data_version(user_id: str) -> int:
+    """Advance the user's data version after a write, invalidating their ETags"""
+    doc = await db.data_versions.find_one_and_update(
+        {"user_id": user_id},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+async def record_write(user_id: str, event_type: str, entry_ids: Sequence[str] = (), **delta) -> int:
+    """Bump the user's data version after a write and publish the change on /events.
+
+    Subscribers get `delta` with the new version and refreshed stats; `entry_ids`
+    (the written entries and their recomputed neighbours) go out as full entries so
+    clients can patch them in place. Without subscribers only the version moves.
+    """
+    version = await bump_data_version(user_id)
+    if event_broker.has_subscribers(user_id):
+        try:
+            stats, entries = await asyncio.gather(load_stats(user_id), load_entry_dicts(user_id, entry_ids))
+            event_broker.publish(user_id, {"type": event_type, "version": version, **delta, "entries": entries, "stats": stats})
+        except Exception as e:
+            # The write itself succeeded; subscribers see the version gap and resync
+            logger.error(f"Error publishing {event_type} event: {e}")
+    return version
+
+def data_etag(user_id: str, version: int) -> str:
+    user_hash = hashlib.sha256(user_id.encode()).hexdigest()[:16]
+    return f'W/"{user_hash}-{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in candidates]
+
+async def not_modified_response(request: Request, response: Response, user_id: str) -> Optional[Response]:
+    """Tag the response with the user's data version; return a 304 if the client already has it.
+
+    Waits for the user's queued recalculations first, so the version and the data
+    read after it are consistent. Costs one data_versions lookup. The version is
+    read before any data, so a concurrent write can only make the ETag stale,
+    never too new.
+    """
+    await recalculation_queue.wait(user_id)
+    etag = data_etag(user_id, await get_data_version(user_id))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 async def require_auth(current_user: User = Depends(get_current_user)) -> User:
     """Require authentication"""
     if not current_user:
         raise HTTPException(status_code=401, detail="Authentication required")
     return current_user
 
-def calculate_pnl_metrics(current_total: float, previous_total: float) -> Dict[str, float]:
-    """Calculate PnL percentage and amount"""
-    if previous_total == 0:
-        return {"pnl_percentage": 0.0, "pnl_amount": 0.0}
-    
-    pnl_amount = current_total - previous_total
-    pnl_percentage = (pnl_amount / previous_total) * 100
-    
-    return {
-        "pnl_percentage": round(pnl_percentage, 2),
-        "pnl_amount": round(pnl_amount, 2)
-    }
-
-def calculate_kpi_progress(current_total: float, user_kpis: List[Dict]) -> List[Dict]:
-    """Calculate progress towards dynamic KPI goals"""
-    kpi_progress = []
-    for kpi in user_kpis:
-        progress = current_total - kpi["target_amount"]
-        kpi_progress.append({
-            "kpi_id": kpi["id"],
-            "progress": round(progress, 2)
-        })
-    return kpi_progress
-
 # API Routes
 @api_router.get("/")
 async def root():
@@ -212,16 +337,9 @@ async def authenticate_with_google(request: Request, response: Response):
         if not token:
             raise HTTPException(status_code=400, detail="Google token required")
         
-        # Verify Google token
+        # Verify Google token (off the event loop, against cached certs)
         try:
-            # You need to set your Google Client ID in environment variables
-            GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', 'your-google-client-id.apps.googleusercontent.com')
-            
-            idinfo = id_token.verify_oauth2_token(
-                token, 
-                requests.Request(), 
-                GOOGLE_CLIENT_ID
-            )
+            idinfo = await google_verifier.verify(token)
             
             # Get user info from Google token
             email = idinfo.get('email')
@@ -297,16 +415,13 @@ async def authenticate_user(request: Request, response: Response):
             raise HTTPException(status_code=400, detail="Session ID required")
         
         # Call OAuth auth API
-        async with aiohttp.ClientSession() as session:
-            headers = {"X-Session-ID": session_id}
-            async with session.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers=headers
-            ) as auth_response:
-                if auth_response.status != 200:
-                    raise HTTPException(status_code=401, detail="Invalid session")
-                
-                auth_data = await auth_response.json()
+        headers = {"X-Session-ID": session_id}
+        status, auth_data = await http_client.get_json(
+            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+            headers=headers
+        )
+        if status != 200 or not auth_data:
+            raise HTTPException(status_code=401, detail="Invalid session")
         
         # Check if user exists
         existing_user = await db.users.find_one({"email": auth_data["email"]})
@@ -367,7 +482,8 @@ async def logout(request: Request, response: Response):
         session_token = request.cookies.get("session_token")
         
         if session_token:
-            # Remove session from database
+            # Remove session from database and the session cache
+            session_cache.invalidate(session_token)
             await db.user_sessions.delete_one({"session_token": session_token})
         
         # Clear cookie
@@ -391,6 +507,16 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=401, detail="Not authenticated")
     return current_user
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """In-process cache and queue counters"""
+    return {
+        "session_cache": session_cache.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "events": event_broker.stats(),
+        "recalculation_queue": recalculation_queue.stats()
+    }
+
 # Exchange Management Endpoints
 @api_router.get("/exchanges", response_model=List[Exchange])
 async def get_exchanges(current_user: User = Depends(require_auth)):
@@ -425,6 +551,7 @@ async def create_exchange(exchange_data: ExchangeCreate, current_user: User = De
         exchange_dict["user_id"] = current_user.id
         
         await db.exchanges.insert_one(exchange_dict)
+        await record_write(current_user.id, "exchange.created", exchange=exchange)
         return exchange
     except HTTPException:
         raise
@@ -454,6 +581,7 @@ async def delete_exchange(exchange_id: str, current_user: User = Depends(require
                 {"id": exchange_id, "user_id": current_user.id},
                 {"$set": {"is_active": False}}
             )
+            await record_write(current_user.id, "exchange.deactivated", exchange_id=exchange_id)
             return {"message": "Exchange deactivated (used in historical entries)"}
         else:
             # Safe to delete
@@ -463,6 +591,7 @@ async def delete_exchange(exchange_id: str, current_user: User = Depends(require
             })
             if result.deleted_count == 0:
                 raise HTTPException(status_code=404, detail="Exchange not found")
+            await record_write(current_user.id, "exchange.deleted", exchange_id=exchange_id)
             return {"message": "Exchange deleted successfully"}
             
     except HTTPException:
@@ -487,6 +616,7 @@ async def initialize_default_exchanges(current_user: User = Depends(require_auth
                 exchange_dict = exchange.dict()
                 exchange_dict["user_id"] = current_user.id
                 await db.exchanges.insert_one(exchange_dict)
+            await record_write(current_user.id, "exchanges.initialized")
             
             return {"message": "Default exchanges initialized"}
         else:
@@ -528,6 +658,7 @@ async def create_kpi(kpi_data: KPICreate, current_user: User = Depends(require_a
         kpi_dict["user_id"] = current_user.id
         
         await db.kpis.insert_one(kpi_dict)
+        await record_write(current_user.id, "kpi.created", kpi=kpi)
         return kpi
     except HTTPException:
         raise
@@ -554,13 +685,11 @@ async def update_kpi(kpi_id: str, kpi_data: KPICreate, current_user: User = Depe
                 "color": kpi_data.color
             }}
         )
+        await record_write(current_user.id, "kpi.updated", kpi_id=kpi_id)
         
         # Get updated KPI
         updated_kpi = await db.kpis.find_one({"id": kpi_id, "user_id": current_user.id})
         
-        # Recalculate all entries for this user
-        await recalculate_all_entries(current_user.id)
-        
         return KPI(**updated_kpi)
         
     except HTTPException:
@@ -587,9 +716,7 @@ async def delete_kpi(kpi_id: str, current_user: User = Depends(require_auth)):
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="KPI not found")
-        
-        # Recalculate all entries for this user
-        await recalculate_all_entries(current_user.id)
+        await record_write(current_user.id, "kpi.deleted", kpi_id=kpi_id)
         
         return {"message": "KPI deleted successfully"}
         
@@ -615,6 +742,7 @@ async def initialize_default_kpis(current_user: User = Depends(require_auth)):
                 kpi_dict = kpi.dict()
                 kpi_dict["user_id"] = current_user.id
                 await db.kpis.insert_one(kpi_dict)
+            await record_write(current_user.id, "kpis.initialized")
             
             return {"message": "Default KPIs initialized"}
         else:
@@ -625,32 +753,26 @@ async def initialize_default_kpis(current_user: User = Depends(require_auth)):
 @api_router.post("/entries", response_model=PnLEntry)
 async def create_pnl_entry(entry_data: PnLEntryCreate, current_user: User = Depends(require_auth)):
     try:
+        entry_id = str(uuid.uuid4())
+        
         # Calculate total from dynamic balances
         total = sum(balance.amount for balance in entry_data.balances)
         
         # Get previous entry for PnL calculation
-        previous_entry = await db.pnl_entries.find_one(
-            {
-                "user_id": current_user.id,
-                "date": {"$lt": entry_data.date.isoformat()}
-            }, 
-            sort=[("date", -1)]
-        )
+        previous_entry = await find_previous_entry(current_user.id, to_db_date(entry_data.date), entry_id)
         
-        previous_total = previous_entry["total"] if previous_entry else total
+        previous_total = previous_entry["total"] if previous_entry else round(total, 2)
         
         # Get user's KPIs
-        user_kpis = await db.kpis.find({
-            "user_id": current_user.id,
-            "is_active": True
-        }).to_list(100)
+        user_kpis = await get_active_kpis(current_user.id)
         
         # Calculate metrics
-        pnl_metrics = calculate_pnl_metrics(total, previous_total)
+        pnl_metrics = calculate_pnl_metrics(round(total, 2), previous_total)
         kpi_progress = calculate_kpi_progress(total, user_kpis)
         
         # Create entry
         entry = PnLEntry(
+            id=entry_id,
             date=entry_data.date,
             balances=entry_data.balances,
             total=round(total, 2),
@@ -662,14 +784,16 @@ async def create_pnl_entry(entry_data: PnLEntryCreate, current_user: User = Depe
         
         # Insert into database
         entry_dict = entry.dict()
-        entry_dict["date"] = entry_dict["date"].isoformat()  # Convert date to string
+        entry_dict["date"] = to_db_date(entry_dict["date"])  # Stored as a BSON date
         entry_dict["balances"] = [balance.dict() for balance in entry.balances]
-        entry_dict["kpi_progress"] = [kpi.dict() for kpi in entry.kpi_progress]
+        del entry_dict["kpi_progress"]  # Derived from the current KPIs at read time
         entry_dict["user_id"] = current_user.id
         await db.pnl_entries.insert_one(entry_dict)
+        await apply_rollup_deltas(current_user.id, rollup_deltas([], [entry_dict]))
         
-        # Recalculate PnL for subsequent entries
-        await recalculate_subsequent_entries(entry_data.date, current_user.id)
+        # Only the entry right after the new one depends on it
+        report = await propagate_entry_change(current_user.id, [(entry_dict["date"], entry.id)])
+        await record_write(current_user.id, "entries.changed", entry_ids=[entry.id, *report.updated_ids])
         
         return entry
         
@@ -684,35 +808,98 @@ async def create_pnl_entry(entry_data: PnLEntryCreate, current_user: User = Depe
 
 
 
+# Largest accepted POST /entries/batch
+MAX_BATCH_ENTRIES = 1000
+
+@api_router.post("/entries/batch")
+async def create_pnl_entries_batch(entries_data: List[PnLEntryCreate], current_user: User = Depends(require_auth)):
+    """Create many entries with one bulk insert and one chain recalculation.
+
+    Each item is checked on its own; items with no balances or with exchanges the
+    user doesn't have are reported as errors and the rest are still created.
+    Results come back in request order.
+    """
+    try:
+        if len(entries_data) > MAX_BATCH_ENTRIES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ENTRIES} entries per batch")
+        
+        exchanges, user_kpis = await asyncio.gather(
+            db.exchanges.find({"user_id": current_user.id}, {"_id": 0, "id": 1}).to_list(1000),
+            get_active_kpis(current_user.id)
+        )
+        exchange_ids = {exchange["id"] for exchange in exchanges}
+        
+        results = [None] * len(entries_data)
+        valid = []
+        for index, entry_data in enumerate(entries_data):
+            unknown = sorted({balance.exchange_id for balance in entry_data.balances} - exchange_ids)
+            if not entry_data.balances:
+                results[index] = {"index": index, "status": "error", "error": "Entry has no balances"}
+            elif unknown:
+                results[index] = {"index": index, "status": "error", "error": f"Unknown exchange ids: {', '.join(unknown)}"}
+            else:
+                valid.append(index)
+        
+        documents = await insert_entries_bulk(current_user.id, [entries_data[index] for index in valid])
+        for index, document in zip(valid, documents):
+            results[index] = {"index": index, "status": "created", "entry": entry_response_dict(document, user_kpis)}
+        if documents:
+            await record_write(current_user.id, "entries.imported", created=len(documents))
+        
+        return {
+            "created": len(documents),
+            "failed": len(entries_data) - len(documents),
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/entries/recalculate", status_code=202)
+async def queue_recalculation(from_date: Optional[date] = None, current_user: User = Depends(require_auth)):
+    """Queue a full recalculation of the user's PnL chain, from `from_date` onwards if given.
+
+    Once the app's recalculation workers are running this returns without waiting
+    for the run; outside the app's lifespan (no started workers) the run happens
+    inline before the response. Requests arriving while one is still waiting are
+    merged into a single run from the earliest date, and read endpoints wait for it.
+    """
+    try:
+        if from_date:
+            await recalculate_subsequent_entries(from_date, current_user.id)
+        else:
+            await recalculate_all_entries(current_user.id)
+        return {"message": "Recalculation queued", "from_date": from_date}
+    except Exception as e:
+        # The details stay in the log; they may include database internals
+        logger.error(f"Error queueing recalculation for user {current_user.id}: {e}")
+        raise HTTPException(status_code=500, detail="Could not queue the recalculation")
+
 # Internal function for creating entries (extracted from the main endpoint)
 async def create_pnl_entry_internal(entry_data: PnLEntryCreate, current_user: User):
     """Internal function to create PnL entry"""
+    entry_id = str(uuid.uuid4())
+    
     # Calculate total from dynamic balances
     total = sum(balance.amount for balance in entry_data.balances)
     
     # Get previous entry for PnL calculation
-    previous_entry = await db.pnl_entries.find_one(
-        {
-            "user_id": current_user.id,
-            "date": {"$lt": entry_data.date.isoformat()}
-        }, 
-        sort=[("date", -1)]
-    )
+    previous_entry = await find_previous_entry(current_user.id, to_db_date(entry_data.date), entry_id)
     
-    previous_total = previous_entry["total"] if previous_entry else total
+    previous_total = previous_entry["total"] if previous_entry else round(total, 2)
     
     # Get user's KPIs
-    user_kpis = await db.kpis.find({
-        "user_id": current_user.id,
-        "is_active": True
-    }).to_list(100)
+    user_kpis = await get_active_kpis(current_user.id)
     
     # Calculate metrics
-    pnl_metrics = calculate_pnl_metrics(total, previous_total)
+    pnl_metrics = calculate_pnl_metrics(round(total, 2), previous_total)
     kpi_progress = calculate_kpi_progress(total, user_kpis)
     
     # Create entry
     entry = PnLEntry(
+        id=entry_id,
         date=entry_data.date,
         balances=entry_data.balances,
         total=round(total, 2),
@@ -724,14 +911,16 @@ async def create_pnl_entry_internal(entry_data: PnLEntryCreate, current_user: Us
     
     # Insert into database
     entry_dict = entry.dict()
-    entry_dict["date"] = entry_dict["date"].isoformat()
+    entry_dict["date"] = to_db_date(entry_dict["date"])
     entry_dict["balances"] = [balance.dict() for balance in entry.balances]
-    entry_dict["kpi_progress"] = [kpi.dict() for kpi in entry.kpi_progress]
+    del entry_dict["kpi_progress"]  # Derived from the current KPIs at read time
     entry_dict["user_id"] = current_user.id
     await db.pnl_entries.insert_one(entry_dict)
+    await apply_rollup_deltas(current_user.id, rollup_deltas([], [entry_dict]))
     
-    # Recalculate PnL for subsequent entries
-    await recalculate_subsequent_entries(entry_data.date, current_user.id)
+    # Only the entry right after the new one depends on it
+    report = await propagate_entry_change(current_user.id, [(entry_dict["date"], entry.id)])
+    await record_write(current_user.id, "entries.changed", entry_ids=[entry.id, *report.updated_ids])
     
     # Return dict instead of Pydantic model to avoid serialization issues
     return {
@@ -746,395 +935,511 @@ async def create_pnl_entry_internal(entry_data: PnLEntryCreate, current_user: Us
         "created_at": entry.created_at.isoformat()
     }
 
+# Stored fields the entry read endpoints send back; _id and user_id stay in Mongo
+ENTRY_READ_PROJECTION = {
+    "_id": 0, "id": 1, "date": 1, "balances": 1, "total": 1,
+    "pnl_percentage": 1, "pnl_amount": 1, "notes": 1, "created_at": 1
+}
+
+def entry_response_dict(entry: Dict, user_kpis: List[Dict]) -> Dict:
+    """PnLEntry-shaped dict built straight from a stored document.
+
+    Documents are written by this API, so the read endpoints trust their shape and
+    skip model construction and response_model validation; orjson encodes dates.
+    """
+    return {
+        "id": entry["id"],
+        "date": from_db_date(entry["date"]),
+        "balances": entry["balances"],
+        "total": entry["total"],
+        "pnl_percentage": entry["pnl_percentage"],
+        "pnl_amount": entry["pnl_amount"],
+        # Derive KPI progress from the current KPIs
+        "kpi_progress": calculate_kpi_progress(entry["total"], user_kpis),
+        "notes": entry.get("notes", ""),
+        "created_at": entry.get("created_at")
+    }
+
+async def load_entry_dicts(user_id: str, entry_ids: Sequence[str]) -> List[Dict]:
+    """Response dicts for the given entries, in chain order"""
+    if not entry_ids:
+        return []
+    entries, user_kpis = await asyncio.gather(
+        db.pnl_entries.find(
+            {"user_id": user_id, "id": {"$in": list(entry_ids)}},
+            ENTRY_READ_PROJECTION
+        ).sort([("date", 1), ("id", 1)]).to_list(None),
+        get_active_kpis(user_id)
+    )
+    return [entry_response_dict(entry, user_kpis) for entry in entries]
+
+def encode_entry_cursor(entry: Dict) -> str:
+    """Opaque keyset cursor for an entry's (date, id) chain position"""
+    raw = f"{from_db_date(entry['date']).isoformat()}|{entry['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_entry_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        entry_date, entry_id = raw.split("|", 1)
+        return to_db_date(date.fromisoformat(entry_date)), entry_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @api_router.get("/entries", response_model=List[PnLEntry])
-async def get_pnl_entries(current_user: User = Depends(require_auth), limit: int = 100):
+async def get_pnl_entries(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(require_auth),
+    limit: int = 100,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """Entries newest first, paginated by (date, id) keyset cursors.
+
+    Without a cursor or with `before`, a page holds the next older entries; with
+    `after`, the entries just newer than the cursor. When there is more in that
+    direction, X-Next-Cursor holds the cursor to pass back under the same name.
+    """
     try:
-        entries = await db.pnl_entries.find({
-            "user_id": current_user.id
-        }).sort("date", -1).limit(limit).to_list(limit)
-        result = []
-        for entry in entries:
-            # Convert balances back to Pydantic models
-            entry["balances"] = [DynamicBalance(**balance) for balance in entry["balances"]]
-            # Convert KPI progress back to Pydantic models
-            entry["kpi_progress"] = [DynamicKPI(**kpi) for kpi in entry.get("kpi_progress", [])]
-            result.append(PnLEntry(**entry))
-        return result
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either before or after, not both")
+        limit = max(1, min(limit, 1000))
+        not_modified = await not_modified_response(request, response, current_user.id)
+        if not_modified:
+            return not_modified
+        
+        query = {"user_id": current_user.id}
+        if before:
+            query = entry_position_filter(current_user.id, *decode_entry_cursor(before), "$lt")
+        elif after:
+            query = entry_position_filter(current_user.id, *decode_entry_cursor(after), "$gt")
+        date_range = {}
+        if start_date:
+            date_range["$gte"] = to_db_date(start_date)
+        if end_date:
+            date_range["$lte"] = to_db_date(end_date)
+        if date_range:
+            query["date"] = date_range
+        
+        # Walk the (user_id, date, id) index away from the cursor; one extra row tells us if there's more
+        direction = 1 if after else -1
+        entries = await db.pnl_entries.find(query, ENTRY_READ_PROJECTION).sort(
+            [("date", direction), ("id", direction)]
+        ).limit(limit + 1).to_list(limit + 1)
+        if len(entries) > limit:
+            entries = entries[:limit]
+            response.headers["X-Next-Cursor"] = encode_entry_cursor(entries[-1])
+        if after:
+            entries.reverse()
+        
+        user_kpis = await get_active_kpis(current_user.id)
+        return FastJSONResponse(
+            [entry_response_dict(entry, user_kpis) for entry in entries],
+            headers=dict(response.headers)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/entries/{entry_id}", response_model=PnLEntry)
 async def get_pnl_entry(entry_id: str, current_user: User = Depends(require_auth)):
     try:
-        entry = await db.pnl_entries.find_one({
-            "id": entry_id,
-            "user_id": current_user.id
-        })
+        await recalculation_queue.wait(current_user.id)
+        entry, user_kpis = await asyncio.gather(
+            db.pnl_entries.find_one({"id": entry_id, "user_id": current_user.id}, ENTRY_READ_PROJECTION),
+            get_active_kpis(current_user.id)
+        )
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found")
-        # Convert balances back to Pydantic models
-        entry["balances"] = [DynamicBalance(**balance) for balance in entry["balances"]]
-        # Convert KPI progress back to Pydantic models  
-        entry["kpi_progress"] = [DynamicKPI(**kpi) for kpi in entry.get("kpi_progress", [])]
-        return PnLEntry(**entry)
+        return FastJSONResponse(entry_response_dict(entry, user_kpis))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/entries/{entry_id}", response_model=PnLEntry)
-async def update_pnl_entry(entry_id: str, update_data: PnLEntryUpdate):
+async def update_pnl_entry(entry_id: str, update_data: PnLEntryUpdate, current_user: User = Depends(require_auth)):
     try:
-        entry = await db.pnl_entries.find_one({"id": entry_id})
+        entry = await db.pnl_entries.find_one({"id": entry_id, "user_id": current_user.id})
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found")
         
         # Update fields
         update_dict = {}
         if update_data.date:
-            update_dict["date"] = update_data.date.isoformat()
+            update_dict["date"] = to_db_date(update_data.date)
         if update_data.balances:
             update_dict["balances"] = [balance.dict() for balance in update_data.balances]
             # Recalculate total
             total = sum(balance.amount for balance in update_data.balances)
             update_dict["total"] = round(total, 2)
             
-            # Recalculate KPI progress
-            kpi_progress = calculate_kpi_progress(total)
-            update_dict.update(kpi_progress)
-            
         if update_data.notes is not None:
             update_dict["notes"] = update_data.notes
         
         # Update in database
-        await db.pnl_entries.update_one({"id": entry_id}, {"$set": update_dict})
+        await db.pnl_entries.update_one({"id": entry_id, "user_id": current_user.id}, {"$set": update_dict})
+        if "date" in update_dict:
+            # Move the entry's current PnL to its new month; PnL changes follow below
+            await apply_rollup_deltas(current_user.id, rollup_deltas([entry], [{**entry, "date": update_dict["date"]}]))
         
-        # Get updated entry
-        updated_entry = await db.pnl_entries.find_one({"id": entry_id})
-        
-        # Recalculate PnL for this and subsequent entries
+        # Recalculate PnL for this entry and its neighbours at the old and new position
+        changed_ids = [entry_id]
         if update_data.balances or update_data.date:
-            entry_date = update_data.date if update_data.date else datetime.fromisoformat(entry["date"]).date()
-            await recalculate_subsequent_entries(entry_date)
+            positions = [(entry["date"], entry_id)]
+            if update_data.date and update_dict["date"] != entry["date"]:
+                positions.append((update_dict["date"], entry_id))
+            report = await propagate_entry_change(current_user.id, positions)
+            changed_ids.extend(report.updated_ids)
+        await record_write(current_user.id, "entries.changed", entry_ids=changed_ids)
+        
+        # Get updated entry
+        updated_entry = await db.pnl_entries.find_one({"id": entry_id, "user_id": current_user.id})
         
         # Convert back to Pydantic model
+        updated_entry["date"] = from_db_date(updated_entry["date"])
         updated_entry["balances"] = [DynamicBalance(**balance) for balance in updated_entry["balances"]]
+        user_kpis = await get_active_kpis(current_user.id)
+        updated_entry["kpi_progress"] = [DynamicKPI(**kpi) for kpi in calculate_kpi_progress(updated_entry["total"], user_kpis)]
         return PnLEntry(**updated_entry)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/entries/{entry_id}")
-async def delete_pnl_entry(entry_id: str):
+async def delete_pnl_entry(entry_id: str, current_user: User = Depends(require_auth)):
     try:
-        entry = await db.pnl_entries.find_one({"id": entry_id})
+        entry = await db.pnl_entries.find_one({"id": entry_id, "user_id": current_user.id})
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found")
         
-        entry_date = datetime.fromisoformat(entry["date"]).date()
-        
         # Delete entry
-        await db.pnl_entries.delete_one({"id": entry_id})
+        await db.pnl_entries.delete_one({"id": entry_id, "user_id": current_user.id})
+        await apply_rollup_deltas(current_user.id, rollup_deltas([entry], []))
         
-        # Recalculate PnL for subsequent entries
-        await recalculate_subsequent_entries(entry_date)
+        # The old successor now follows the old predecessor
+        report = await propagate_entry_change(current_user.id, [(entry["date"], entry_id)])
+        await record_write(current_user.id, "entries.changed", entry_ids=report.updated_ids, deleted=[entry_id])
         
         return {"message": "Entry deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def empty_stats() -> Dict:
+    """Stats payload for a user without entries"""
+    return {
+        "total_entries": 0,
+        "total_balance": 0,
+        "daily_pnl": 0,
+        "daily_pnl_percentage": 0,
+        "avg_daily_pnl": 0,
+        "avg_daily_pnl_percentage": 0,
+        "avg_monthly_pnl_percentage": 0,
+        "kpi_progress": {"5k": 0, "10k": 0, "15k": 0},
+        "total_capital_deposited": 0,
+        "total_starting_balance": 0,
+        "roi_vs_capital": 0,
+        "roi_vs_starting_balance": 0
+    }
+
+def summarize_kpi_progress(total: float, kpis: List[Dict]) -> Dict[str, float]:
+    """Map progress towards the 5K/10K/15K goals for the stats card"""
+    kpi_progress_dict = {}
+    for kpi, kpi_prog in zip(kpis, calculate_kpi_progress(total, kpis)):
+        target = kpi["target_amount"]
+        if target == 5000:
+            kpi_progress_dict["5k"] = kpi_prog["progress"]
+        elif target == 10000:
+            kpi_progress_dict["10k"] = kpi_prog["progress"]
+        elif target == 15000:
+            kpi_progress_dict["15k"] = kpi_prog["progress"]
+    
+    # Fallback to default values if no KPI progress found
+    if not kpi_progress_dict:
+        kpi_progress_dict = {
+            "5k": total - 5000,
+            "10k": total - 10000,
+            "15k": total - 15000
+        }
+    return kpi_progress_dict
+
+def build_stats(summary: Dict, monthly_rollups: List[Dict], capital_totals: tuple, kpis: List[Dict]) -> Dict:
+    """Stats payload from an entry summary (latest entry, count, average daily PnL) and the supporting data"""
+    latest_entry = summary["latest"]
+    avg_monthly_pnl_percentage = (
+        sum(month["pnl_percentage_sum"] for month in monthly_rollups) / len(monthly_rollups)
+    ) if monthly_rollups else 0
+    total_capital_deposited, total_starting_balance = capital_totals
+    
+    # Calculate ROI vs capital and starting balance
+    current_total = latest_entry["total"]
+    roi_vs_capital = ((current_total - total_capital_deposited) / total_capital_deposited * 100) if total_capital_deposited > 0 else 0
+    roi_vs_starting_balance = ((current_total - total_starting_balance) / total_starting_balance * 100) if total_starting_balance > 0 else 0
+    
+    kpi_progress_dict = summarize_kpi_progress(current_total, kpis)
+
+    return {
+        "total_entries": summary["total_entries"],
+        "total_balance": latest_entry["total"],
+        "daily_pnl": latest_entry["pnl_amount"],
+        "daily_pnl_percentage": latest_entry["pnl_percentage"],
+        "avg_daily_pnl": round(summary["avg_daily_pnl"], 2),
+        "avg_daily_pnl_percentage": round(summary["avg_daily_pnl_percentage"], 2),
+        "avg_monthly_pnl_percentage": round(avg_monthly_pnl_percentage, 2),
+        "kpi_progress": kpi_progress_dict,
+        "total_capital_deposited": round(total_capital_deposited, 2),
+        "total_starting_balance": round(total_starting_balance, 2),
+        "roi_vs_capital": round(roi_vs_capital, 2),
+        "roi_vs_starting_balance": round(roi_vs_starting_balance, 2)
+    }
+
+async def get_capital_totals(user_id: str) -> tuple:
+    """Sums of the user's capital deposits and exchange starting balances"""
+    deposits_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+    ]
+    starting_balances_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "total": {"$sum": "$starting_balance"}}}
+    ]
+    deposits_result, starting_result = await asyncio.gather(
+        db.capital_deposits.aggregate(deposits_pipeline).to_list(1),
+        db.exchange_starting_balances.aggregate(starting_balances_pipeline).to_list(1)
+    )
+    return (
+        deposits_result[0]["total"] if deposits_result else 0,
+        starting_result[0]["total"] if starting_result else 0
+    )
+
+async def load_entry_summary(user_id: str) -> Optional[Dict]:
+    """The entry summary build_stats needs from a single $facet pass, or None without entries"""
+    facet_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"date": -1, "id": -1}},
+        {"$facet": {
+            "latest": [
+                {"$limit": 1},
+                {"$project": {"_id": 0, "total": 1, "pnl_amount": 1, "pnl_percentage": 1}}
+            ],
+            "count": [{"$count": "total_entries"}],
+            "avg_amount": [
+                {"$match": {"pnl_amount": {"$ne": 0}}},
+                {"$group": {"_id": None, "avg_pnl": {"$avg": "$pnl_amount"}}}
+            ],
+            "avg_percentage": [
+                {"$match": {"pnl_percentage": {"$ne": 0}}},
+                {"$group": {"_id": None, "avg_pnl_pct": {"$avg": "$pnl_percentage"}}}
+            ]
+        }}
+    ]
+    facets = (await db.pnl_entries.aggregate(facet_pipeline).to_list(1))[0]
+    if not facets["latest"]:
+        return None
+    return {
+        "latest": facets["latest"][0],
+        "total_entries": facets["count"][0]["total_entries"],
+        "avg_daily_pnl": facets["avg_amount"][0]["avg_pnl"] if facets["avg_amount"] else 0,
+        "avg_daily_pnl_percentage": facets["avg_percentage"][0]["avg_pnl_pct"] if facets["avg_percentage"] else 0
+    }
+
+async def load_stats(user_id: str) -> Dict:
+    """The /stats payload for a user"""
+    # The entry summary, monthly rollups, deposit/starting-balance sums and KPIs are fetched concurrently
+    summary, monthly_rollups, capital_totals, kpis = await asyncio.gather(
+        load_entry_summary(user_id),
+        get_monthly_rollups(user_id),
+        get_capital_totals(user_id),
+        get_active_kpis(user_id)
+    )
+    if summary is None:
+        return empty_stats()
+    return build_stats(summary, monthly_rollups, capital_totals, kpis)
+
 @api_router.get("/stats")
-async def get_portfolio_stats(current_user: User = Depends(require_auth)):
+async def get_portfolio_stats(request: Request, response: Response, current_user: User = Depends(require_auth)):
     try:
-        # Get latest entry for this user
-        latest_entry = await db.pnl_entries.find_one(
-            {"user_id": current_user.id},
-            sort=[("date", -1)]
-        )
-        if not latest_entry:
-            return {
-                "total_entries": 0,
-                "total_balance": 0,
-                "daily_pnl": 0,
-                "daily_pnl_percentage": 0,
-                "avg_daily_pnl": 0,
-                "avg_daily_pnl_percentage": 0,
-                "avg_monthly_pnl_percentage": 0,
-                "kpi_progress": {"5k": 0, "10k": 0, "15k": 0},
-                "total_capital_deposited": 0,
-                "total_starting_balance": 0,
-                "roi_vs_capital": 0,
-                "roi_vs_starting_balance": 0
-            }
-        
-        # Get total entries count for this user
-        total_entries = await db.pnl_entries.count_documents({"user_id": current_user.id})
+        not_modified = await not_modified_response(request, response, current_user.id)
+        if not_modified:
+            return not_modified
+        return await load_stats(current_user.id)
         
-        # Calculate total capital deposited
-        capital_deposits = await db.capital_deposits.find({
-            "user_id": current_user.id
-        }).to_list(length=None)
-        total_capital_deposited = sum(deposit["amount"] for deposit in capital_deposits)
-        
-        # Calculate total starting balance across all exchanges
-        starting_balances = await db.exchange_starting_balances.find({
-            "user_id": current_user.id
-        }).to_list(length=None)
-        total_starting_balance = sum(balance["starting_balance"] for balance in starting_balances)
-        
-        # Calculate ROI vs capital and starting balance
-        current_total = latest_entry["total"]
-        roi_vs_capital = ((current_total - total_capital_deposited) / total_capital_deposited * 100) if total_capital_deposited > 0 else 0
-        roi_vs_starting_balance = ((current_total - total_starting_balance) / total_starting_balance * 100) if total_starting_balance > 0 else 0
-        
-        # Calculate average daily PnL (amount and percentage) for this user
-        pipeline_amount = [
-            {"$match": {"user_id": current_user.id, "pnl_amount": {"$ne": 0}}},
-            {"$group": {"_id": None, "avg_pnl": {"$avg": "$pnl_amount"}}}
-        ]
-        avg_amount_result = await db.pnl_entries.aggregate(pipeline_amount).to_list(1)
-        avg_daily_pnl = avg_amount_result[0]["avg_pnl"] if avg_amount_result else 0
-        
-        pipeline_percentage = [
-            {"$match": {"user_id": current_user.id, "pnl_percentage": {"$ne": 0}}},
-            {"$group": {"_id": None, "avg_pnl_pct": {"$avg": "$pnl_percentage"}}}
-        ]
-        avg_pct_result = await db.pnl_entries.aggregate(pipeline_percentage).to_list(1)
-        avg_daily_pnl_percentage = avg_pct_result[0]["avg_pnl_pct"] if avg_pct_result else 0
-        
-        # Calculate average monthly PnL percentage for this user
-        monthly_pipeline = [
-            {"$match": {"user_id": current_user.id, "pnl_percentage": {"$ne": 0}}},
-            {"$addFields": {
-                "year": {"$year": {"$dateFromString": {"dateString": "$date"}}},
-                "month": {"$month": {"$dateFromString": {"dateString": "$date"}}}
-            }},
-            {"$group": {
-                "_id": {"year": "$year", "month": "$month"},
-                "monthly_pnl": {"$sum": "$pnl_percentage"}
-            }},
-            {"$group": {
-                "_id": None,
-                "avg_monthly_pnl": {"$avg": "$monthly_pnl"}
-            }}
-        ]
-        monthly_result = await db.pnl_entries.aggregate(monthly_pipeline).to_list(1)
-        avg_monthly_pnl_percentage = monthly_result[0]["avg_monthly_pnl"] if monthly_result else 0
-        
-        # Extract KPI progress from the new structure
-        kpi_progress_dict = {}
-        if "kpi_progress" in latest_entry and latest_entry["kpi_progress"]:
-            # Get KPI names to map progress values for this user
-            kpis = await db.kpis.find({"user_id": current_user.id, "is_active": True}).to_list(100)
-            kpi_lookup = {kpi["id"]: kpi for kpi in kpis}
-            
-            for kpi_prog in latest_entry["kpi_progress"]:
-                kpi_id = kpi_prog["kpi_id"]
-                if kpi_id in kpi_lookup:
-                    kpi = kpi_lookup[kpi_id]
-                    target = kpi["target_amount"]
-                    if target == 5000:
-                        kpi_progress_dict["5k"] = kpi_prog["progress"]
-                    elif target == 10000:
-                        kpi_progress_dict["10k"] = kpi_prog["progress"]
-                    elif target == 15000:
-                        kpi_progress_dict["15k"] = kpi_prog["progress"]
-        
-        # Fallback to default values if no KPI progress found
-        if not kpi_progress_dict:
-            total = latest_entry["total"]
-            kpi_progress_dict = {
-                "5k": total - 5000,
-                "10k": total - 10000,
-                "15k": total - 15000
-            }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+def build_monthly_performance(rollups: List[Dict]) -> Dict:
+    """Monthly/yearly performance report from monthly rollups sorted newest first"""
+    if not rollups:
         return {
-            "total_entries": total_entries,
-            "total_balance": latest_entry["total"],
-            "daily_pnl": latest_entry["pnl_amount"],
-            "daily_pnl_percentage": latest_entry["pnl_percentage"],
-            "avg_daily_pnl": round(avg_daily_pnl, 2),
-            "avg_daily_pnl_percentage": round(avg_daily_pnl_percentage, 2),
-            "avg_monthly_pnl_percentage": round(avg_monthly_pnl_percentage, 2),
-            "kpi_progress": kpi_progress_dict,
-            "total_capital_deposited": round(total_capital_deposited, 2),
-            "total_starting_balance": round(total_starting_balance, 2),
-            "roi_vs_capital": round(roi_vs_capital, 2),
-            "roi_vs_starting_balance": round(roi_vs_starting_balance, 2)
+            "monthly_performance": [],
+            "best_month": None,
+            "worst_month": None,
+            "yearly_summary": []
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Prepare monthly performance data
+    performance_data = []
+    for month in rollups[:100]:
+        month_name = calendar.month_name[month["month"]]
+        performance_data.append({
+            "year": month["year"],
+            "month": month["month"],
+            "month_name": month_name,
+            "monthly_pnl_percentage": round(month["pnl_percentage_sum"], 2),
+            "monthly_pnl_amount": round(month["pnl_amount_sum"], 2),
+            "trading_days": month["trading_days"],
+            "avg_daily_pnl": round(month["pnl_percentage_sum"] / month["trading_days"], 2),
+            "display_name": f"{month_name} {month['year']}"
+        })
+    
+    # Find best and worst months
+    best_month = max(performance_data, key=lambda x: x["monthly_pnl_percentage"])
+    worst_month = min(performance_data, key=lambda x: x["monthly_pnl_percentage"])
+    
+    # Yearly summary
+    years = {}
+    for month in rollups:
+        year = years.setdefault(month["year"], {"pnl_percentage": 0.0, "pnl_amount": 0.0, "trading_days": 0, "months": 0})
+        year["pnl_percentage"] += month["pnl_percentage_sum"]
+        year["pnl_amount"] += month["pnl_amount_sum"]
+        year["trading_days"] += month["trading_days"]
+        year["months"] += 1
+    yearly_summary = []
+    for year_number in sorted(years, reverse=True)[:10]:
+        year = years[year_number]
+        yearly_summary.append({
+            "year": year_number,
+            "yearly_pnl_percentage": round(year["pnl_percentage"], 2),
+            "yearly_pnl_amount": round(year["pnl_amount"], 2),
+            "trading_days": year["trading_days"],
+            "months_active": year["months"],
+            "avg_monthly_pnl": round(year["pnl_percentage"] / year["months"], 2)
+        })
+    
+    return {
+        "monthly_performance": performance_data,
+        "best_month": {
+            "display_name": best_month["display_name"],
+            "pnl_percentage": best_month["monthly_pnl_percentage"],
+            "pnl_amount": best_month["monthly_pnl_amount"],
+            "trading_days": best_month["trading_days"]
+        },
+        "worst_month": {
+            "display_name": worst_month["display_name"],
+            "pnl_percentage": worst_month["monthly_pnl_percentage"],
+            "pnl_amount": worst_month["monthly_pnl_amount"],
+            "trading_days": worst_month["trading_days"]
+        },
+        "yearly_summary": yearly_summary
+    }
+
+# Entry PnL values are stored to the cent, so exact rollup sums are too
+ROLLUP_DECIMALS = 2
+
+async def get_monthly_rollups(user_id: str) -> List[Dict]:
+    """The user's months with at least one trading day, newest first.
+
+    A user whose entries predate the rollups has none yet; they are rebuilt here
+    the first time they're read. Sums are rounded to the cent, which drops the
+    float error repeated $inc deltas pick up (`manage.py rebuild-rollups` resets
+    the stored sums as well).
+    """
+    query = {"user_id": user_id, "trading_days": {"$gt": 0}}
+    rollups = await db.pnl_monthly_rollups.find(query, {"_id": 0}).sort([("year", -1), ("month", -1)]).to_list(None)
+    if not rollups and await db.pnl_entries.find_one({"user_id": user_id, "pnl_percentage": {"$ne": 0}}, {"_id": 1}):
+        await rebuild_monthly_rollups(user_id)
+        rollups = await db.pnl_monthly_rollups.find(query, {"_id": 0}).sort([("year", -1), ("month", -1)]).to_list(None)
+    for month in rollups:
+        month["pnl_percentage_sum"] = round(month["pnl_percentage_sum"], ROLLUP_DECIMALS)
+        month["pnl_amount_sum"] = round(month["pnl_amount_sum"], ROLLUP_DECIMALS)
+    return rollups
 
 @api_router.get("/monthly-performance")
-async def get_monthly_performance():
+async def get_monthly_performance(request: Request, response: Response, current_user: User = Depends(require_auth)):
     """Get monthly performance data showing best/worst months"""
     try:
-        pipeline = [
-            {"$match": {"pnl_percentage": {"$ne": 0}}},
-            {"$addFields": {
-                "year": {"$year": {"$dateFromString": {"dateString": "$date"}}},
-                "month": {"$month": {"$dateFromString": {"dateString": "$date"}}}
-            }},
-            {"$group": {
-                "_id": {"year": "$year", "month": "$month"},
-                "monthly_pnl_percentage": {"$sum": "$pnl_percentage"},
-                "monthly_pnl_amount": {"$sum": "$pnl_amount"},
-                "trading_days": {"$sum": 1},
-                "avg_daily_pnl": {"$avg": "$pnl_percentage"}
-            }},
-            {"$addFields": {
-                "month_name": {
-                    "$switch": {
-                        "branches": [
-                            {"case": {"$eq": ["$_id.month", 1]}, "then": "January"},
-                            {"case": {"$eq": ["$_id.month", 2]}, "then": "February"},
-                            {"case": {"$eq": ["$_id.month", 3]}, "then": "March"},
-                            {"case": {"$eq": ["$_id.month", 4]}, "then": "April"},
-                            {"case": {"$eq": ["$_id.month", 5]}, "then": "May"},
-                            {"case": {"$eq": ["$_id.month", 6]}, "then": "June"},
-                            {"case": {"$eq": ["$_id.month", 7]}, "then": "July"},
-                            {"case": {"$eq": ["$_id.month", 8]}, "then": "August"},
-                            {"case": {"$eq": ["$_id.month", 9]}, "then": "September"},
-                            {"case": {"$eq": ["$_id.month", 10]}, "then": "October"},
-                            {"case": {"$eq": ["$_id.month", 11]}, "then": "November"},
-                            {"case": {"$eq": ["$_id.month", 12]}, "then": "December"}
-                        ],
-                        "default": "Unknown"
-                    }
-                }
-            }},
-            {"$sort": {"_id.year": -1, "_id.month": -1}}
-        ]
-        
-        monthly_data = await db.pnl_entries.aggregate(pipeline).to_list(100)
-        
-        if not monthly_data:
-            return {
-                "monthly_performance": [],
-                "best_month": None,
-                "worst_month": None,
-                "yearly_summary": []
-            }
-        
-        # Find best and worst months
-        best_month = max(monthly_data, key=lambda x: x["monthly_pnl_percentage"])
-        worst_month = min(monthly_data, key=lambda x: x["monthly_pnl_percentage"])
-        
-        # Prepare monthly performance data
-        performance_data = []
-        for month in monthly_data:
-            performance_data.append({
-                "year": month["_id"]["year"],
-                "month": month["_id"]["month"],
-                "month_name": month["month_name"],
-                "monthly_pnl_percentage": round(month["monthly_pnl_percentage"], 2),
-                "monthly_pnl_amount": round(month["monthly_pnl_amount"], 2),
-                "trading_days": month["trading_days"],
-                "avg_daily_pnl": round(month["avg_daily_pnl"], 2),
-                "display_name": f"{month['month_name']} {month['_id']['year']}"
-            })
-        
-        # Yearly summary
-        yearly_pipeline = [
-            {"$match": {"pnl_percentage": {"$ne": 0}}},
-            {"$addFields": {
-                "year": {"$year": {"$dateFromString": {"dateString": "$date"}}}
-            }},
-            {"$group": {
-                "_id": "$year",
-                "yearly_pnl_percentage": {"$sum": "$pnl_percentage"},
-                "yearly_pnl_amount": {"$sum": "$pnl_amount"},
-                "trading_days": {"$sum": 1},
-                "months_active": {"$addToSet": {"$month": {"$dateFromString": {"dateString": "$date"}}}}
-            }},
-            {"$addFields": {
-                "months_count": {"$size": "$months_active"},
-                "avg_monthly_pnl": {"$divide": ["$yearly_pnl_percentage", {"$size": "$months_active"}]}
-            }},
-            {"$sort": {"_id": -1}}
-        ]
-        
-        yearly_data = await db.pnl_entries.aggregate(yearly_pipeline).to_list(10)
-        yearly_summary = []
-        for year in yearly_data:
-            yearly_summary.append({
-                "year": year["_id"],
-                "yearly_pnl_percentage": round(year["yearly_pnl_percentage"], 2),
-                "yearly_pnl_amount": round(year["yearly_pnl_amount"], 2),
-                "trading_days": year["trading_days"],
-                "months_active": year["months_count"],
-                "avg_monthly_pnl": round(year["avg_monthly_pnl"], 2)
-            })
-        
-        return {
-            "monthly_performance": performance_data,
-            "best_month": {
-                "display_name": f"{best_month['month_name']} {best_month['_id']['year']}",
-                "pnl_percentage": round(best_month["monthly_pnl_percentage"], 2),
-                "pnl_amount": round(best_month["monthly_pnl_amount"], 2),
-                "trading_days": best_month["trading_days"]
-            },
-            "worst_month": {
-                "display_name": f"{worst_month['month_name']} {worst_month['_id']['year']}",
-                "pnl_percentage": round(worst_month["monthly_pnl_percentage"], 2),
-                "pnl_amount": round(worst_month["monthly_pnl_amount"], 2),
-                "trading_days": worst_month["trading_days"]
-            },
-            "yearly_summary": yearly_summary
-        }
-        
+        not_modified = await not_modified_response(request, response, current_user.id)
+        if not_modified:
+            return not_modified
+        return build_monthly_performance(await get_monthly_rollups(current_user.id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Entries fetched per cursor batch, and CSV bytes buffered before each chunk is sent
+EXPORT_BATCH_SIZE = 500
+CSV_CHUNK_SIZE = 64 * 1024
+
+def csv_header(exchanges: List[Dict], user_kpis: List[Dict]) -> List[str]:
+    """Dynamic CSV header: one column per exchange and per KPI"""
+    header = ['Date']
+    header.extend([ex["display_name"] for ex in exchanges])
+    header.extend(['Total', 'PnL %', 'PnL €'])
+    header.extend([f"KPI {kpi['name']}" for kpi in user_kpis])
+    header.append('Notes')
+    return header
+
+async def stream_entries_csv(user_id: str, exchanges: List[Dict], user_kpis: List[Dict]):
+    """Yield the user's entries as CSV text chunks straight off a batched Mongo cursor"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(csv_header(exchanges, user_kpis))
+    
+    # Balance column for each exchange id, so every row is one pass over its balances
+    column_index = {ex["id"]: i for i, ex in enumerate(exchanges)}
+    
+    cursor = db.pnl_entries.find(
+        {"user_id": user_id},
+        {"_id": 0, "date": 1, "balances": 1, "total": 1, "pnl_percentage": 1, "pnl_amount": 1, "notes": 1}
+    ).sort([("date", -1), ("id", -1)]).batch_size(EXPORT_BATCH_SIZE)
+    
+    async for entry in cursor:
+        balances = [0.0] * len(exchanges)
+        for balance in entry["balances"]:
+            column = column_index.get(balance["exchange_id"])
+            if column is not None:
+                balances[column] = balance["amount"]
+        
+        row = [from_db_date(entry['date']).isoformat()]
+        row.extend([f"{balance:.2f}" for balance in balances])
+        row.extend([
+            f"{entry['total']:.2f}",
+            f"{entry['pnl_percentage']:.2f}%",
+            f"{entry['pnl_amount']:.2f}"
+        ])
+        # KPI progress is derived from the current KPIs
+        row.extend([f"{kpi['progress']:.2f}" for kpi in calculate_kpi_progress(entry['total'], user_kpis)])
+        row.append(entry.get('notes', ''))
+        writer.writerow(row)
+        
+        if output.tell() >= CSV_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    
+    if output.tell():
+        yield output.getvalue()
+
 @api_router.get("/export/csv")
-async def export_entries_csv():
-    """Export all entries to CSV format"""
+async def export_entries_csv(current_user: User = Depends(require_auth)):
+    """Export all entries to CSV format, streamed with constant memory"""
     try:
-        entries = await db.pnl_entries.find().sort("date", -1).to_list(1000)
-        exchanges = await db.exchanges.find({"is_active": True}).to_list(100)
-        
-        # Create exchange lookup
-        exchange_lookup = {ex["id"]: ex for ex in exchanges}
-        
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Create dynamic header
-        header = ['Date']
-        exchange_names = [ex["display_name"] for ex in exchanges]
-        header.extend(exchange_names)
-        header.extend(['Total', 'PnL %', 'PnL €', 'KPI 5K', 'KPI 10K', 'KPI 15K', 'Notes'])
-        writer.writerow(header)
-        
-        # Write data
-        for entry in entries:
-            row = [entry['date']]
-            
-            # Add exchange balances in order
-            for exchange in exchanges:
-                balance = next((b["amount"] for b in entry["balances"] if b["exchange_id"] == exchange["id"]), 0)
-                row.append(f"{balance:.2f}")
-            
-            # Add other fields
-            row.extend([
-                f"{entry['total']:.2f}",
-                f"{entry['pnl_percentage']:.2f}%",
-                f"{entry['pnl_amount']:.2f}",
-                f"{entry['kpi_5k']:.2f}",
-                f"{entry['kpi_10k']:.2f}",
-                f"{entry['kpi_15k']:.2f}",
-                entry.get('notes', '')
-            ])
-            
-            writer.writerow(row)
-        
-        output.seek(0)
+        await recalculation_queue.wait(current_user.id)
+        exchanges, user_kpis = await asyncio.gather(
+            db.exchanges.find({"user_id": current_user.id, "is_active": True}).to_list(100),
+            get_active_kpis(current_user.id)
+        )
         
-        # Return as streaming response
         return StreamingResponse(
-            io.StringIO(output.getvalue()),
+            stream_entries_csv(current_user.id, exchanges, user_kpis),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=crypto_pnl_data.csv"}
         )
@@ -1142,111 +1447,515 @@ async def export_entries_csv():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/chart-data")
-async def get_chart_data():
-    """Get data formatted for charts"""
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+async def stream_entries_columnar(user_id: str, export_format: str, exchanges: List[Dict]):
+    """Yield a Parquet or Arrow file one record batch at a time, oldest entry first"""
+    column_index = {ex["id"]: i for i, ex in enumerate(exchanges)}
+    schema = entries_schema([ex["name"] for ex in exchanges])
+    writer = ColumnarWriter(export_format, schema)
+    yield writer.header()
+    
+    cursor = db.pnl_entries.find(
+        {"user_id": user_id},
+        {"_id": 0, "date": 1, "balances": 1, "total": 1, "pnl_percentage": 1, "pnl_amount": 1}
+    ).sort([("date", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    
+    entries = []
+    async for entry in cursor:
+        entry["date"] = from_db_date(entry["date"])
+        entries.append(entry)
+        if len(entries) == EXPORT_BATCH_SIZE:
+            yield writer.write_batch(entries_record_batch(entries, column_index, schema))
+            entries = []
+    if entries:
+        yield writer.write_batch(entries_record_batch(entries, column_index, schema))
+    yield writer.close()
+
+async def export_entries_columnar(user_id: str, export_format: str) -> StreamingResponse:
+    """Stream a typed columnar file built from batched cursor reads"""
+    media_type, extension = COLUMNAR_FORMATS[export_format]
+    await recalculation_queue.wait(user_id)
+    
+    # Every exchange, including deactivated ones that still appear in history
+    exchanges = await db.exchanges.find({"user_id": user_id}, {"_id": 0, "id": 1, "name": 1}).sort("name", 1).to_list(1000)
+    
+    return StreamingResponse(
+        stream_entries_columnar(user_id, export_format, exchanges),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=crypto_pnl_data.{extension}"}
+    )
+
+@api_router.get("/export/parquet")
+async def export_entries_parquet(current_user: User = Depends(require_auth)):
+    """Export all entries as a Parquet file (one row group per cursor batch)"""
     try:
-        entries = await db.pnl_entries.find().sort("date", 1).to_list(1000)
-        exchanges = await db.exchanges.find({"is_active": True}).to_list(100)
-        
-        if not entries:
-            return {
-                "portfolio_timeline": [],
-                "pnl_timeline": [],
-                "exchange_breakdown": {}
-            }
-        
-        # Create exchange lookup
-        exchange_lookup = {ex["id"]: ex for ex in exchanges}
+        return await export_entries_columnar(current_user.id, "parquet")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/export/arrow")
+async def export_entries_arrow(current_user: User = Depends(require_auth)):
+    """Export all entries as an Arrow IPC (Feather v2) file"""
+    try:
+        return await export_entries_columnar(current_user.id, "arrow")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Export columns that are derived on import rather than read
+CSV_DERIVED_COLUMNS = {"Total", "PnL %", "PnL €", "Notes"}
+# Import errors reported back before the rest are summarised
+MAX_IMPORT_ERRORS = 100
+
+def parse_entries_csv(lines, exchanges: List[Dict]) -> tuple:
+    """Parse CSV in the /export/csv layout into PnLEntryCreate objects.
+
+    Exchange columns are matched to the user's exchanges by display name or name;
+    Total, PnL and KPI columns are ignored because they are recomputed, and a date
+    may only appear once. Returns (entries, errors), where each error carries its
+    1-based CSV line number.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header or header[0].strip() != "Date":
+        return [], [{"line": 1, "error": "The first column must be Date"}]
+    
+    exchange_lookup = {}
+    for exchange in sorted(exchanges, key=lambda ex: ex.get("is_active", True)):
+        exchange_lookup[exchange["name"].lower()] = exchange["id"]
+        exchange_lookup[exchange["display_name"].lower()] = exchange["id"]
+    
+    exchange_columns, notes_column, errors = [], None, []
+    for column, name in enumerate(header[1:], start=1):
+        name = name.strip()
+        if name == "Notes":
+            notes_column = column
+        elif name in CSV_DERIVED_COLUMNS or name.startswith("KPI "):
+            continue
+        elif name.lower() in exchange_lookup:
+            exchange_columns.append((column, exchange_lookup[name.lower()]))
+        else:
+            errors.append({"line": 1, "error": f"Unknown exchange column: {name}"})
+    if errors:
+        return [], errors
+    
+    entries, date_lines = [], {}
+    for row in reader:
+        line = reader.line_num
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            entry_date = date.fromisoformat(row[0].strip())
+            balances = [
+                DynamicBalance(exchange_id=exchange_id, amount=float(row[column]))
+                for column, exchange_id in exchange_columns
+                if column < len(row) and row[column].strip()
+            ]
+        except ValueError as e:
+            errors.append({"line": line, "error": str(e)})
+            continue
+        if not balances:
+            errors.append({"line": line, "error": "Row has no exchange balances"})
+            continue
+        if entry_date in date_lines:
+            errors.append({"line": line, "error": f"{entry_date.isoformat()} is already on line {date_lines[entry_date]}"})
+            continue
+        date_lines[entry_date] = line
+        notes = row[notes_column] if notes_column is not None and notes_column < len(row) else ""
+        entries.append((line, PnLEntryCreate(date=entry_date, balances=balances, notes=notes)))
+    return entries, errors
+
+@api_router.post("/import/csv")
+async def import_entries_csv(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    current_user: User = Depends(require_auth)
+):
+    """Import entries from a CSV in the /export/csv layout.
+
+    The file is parsed row by row in the threadpool, so a large upload doesn't
+    hold up the event loop, and validated as a whole: rows for dates that
+    already have an entry, or that an earlier row of the file already has, are
+    rejected so an export can't be imported twice. With
+    `dry_run` nothing is written and the validation report is returned; otherwise
+    any error rejects the whole file, and a clean file is inserted in batches with
+    a single chain recalculation.
+    """
+    try:
+        exchanges = await db.exchanges.find({"user_id": current_user.id}).to_list(1000)
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        try:
+            parsed, errors = await run_in_threadpool(parse_entries_csv, lines, exchanges)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="The file is not UTF-8 encoded CSV")
+        
+        if parsed:
+            dates = [to_db_date(entry.date) for _, entry in parsed]
+            existing = await db.pnl_entries.find(
+                {"user_id": current_user.id, "date": {"$gte": min(dates), "$lte": max(dates)}},
+                {"_id": 0, "date": 1}
+            ).to_list(None)
+            existing_dates = {from_db_date(entry["date"]) for entry in existing}
+            errors.extend(
+                {"line": line, "error": f"An entry for {entry.date.isoformat()} already exists"}
+                for line, entry in parsed if entry.date in existing_dates
+            )
+        errors.sort(key=lambda error: error["line"])
+        
+        report = {
+            "dry_run": dry_run,
+            "rows": len(parsed),
+            "imported": 0,
+            "error_count": len(errors),
+            "errors": errors[:MAX_IMPORT_ERRORS]
+        }
+        if dry_run:
+            return report
+        if errors:
+            raise HTTPException(status_code=400, detail=report)
         
-        # Portfolio timeline data
-        portfolio_timeline = []
-        pnl_timeline = []
+        await insert_entries_bulk(current_user.id, [entry for _, entry in parsed])
+        if parsed:
+            await record_write(current_user.id, "entries.imported", created=len(parsed))
+        report["imported"] = len(parsed)
+        return report
         
-        for entry in entries:
-            timeline_entry = {
-                "date": entry["date"],
-                "total": entry["total"]
-            }
-            
-            # Add exchange balances dynamically
-            for balance in entry["balances"]:
-                exchange = exchange_lookup.get(balance["exchange_id"])
-                if exchange:
-                    timeline_entry[exchange["name"]] = balance["amount"]
-            
-            portfolio_timeline.append(timeline_entry)
-            
-            if entry["pnl_percentage"] != 0:  # Skip first entry with 0 PnL
-                pnl_timeline.append({
-                    "date": entry["date"],
-                    "pnl_percentage": entry["pnl_percentage"],
-                    "pnl_amount": entry["pnl_amount"]
-                })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_chart_data(entries: List[Dict], exchanges: List[Dict], max_points: Optional[int] = None) -> Dict:
+    """Chart payload from entries in chain order, optionally downsampled with LTTB"""
+    if not entries:
+        return {
+            "portfolio_timeline": [],
+            "pnl_timeline": [],
+            "exchange_breakdown": {}
+        }
+    
+    # Create exchange lookup
+    exchange_lookup = {ex["id"]: ex for ex in exchanges}
+    days = np.fromiter((from_db_date(entry["date"]).toordinal() for entry in entries), dtype=np.float64, count=len(entries))
+    
+    portfolio_points = np.arange(len(entries))
+    if max_points:
+        totals = np.fromiter((entry["total"] for entry in entries), dtype=np.float64, count=len(entries))
+        portfolio_points = lttb_indices(days, totals, max_points, keep=extreme_indices(totals))
+    
+    # Portfolio timeline data
+    portfolio_timeline = []
+    for i in portfolio_points:
+        entry = entries[i]
+        timeline_entry = {
+            "date": from_db_date(entry["date"]).isoformat(),
+            "total": entry["total"]
+        }
         
-        # Latest exchange breakdown
-        latest = entries[-1]
-        exchange_breakdown = {}
-        for balance in latest["balances"]:
+        # Add exchange balances dynamically
+        for balance in entry["balances"]:
             exchange = exchange_lookup.get(balance["exchange_id"])
             if exchange:
-                exchange_breakdown[exchange["name"]] = {
-                    "amount": balance["amount"],
-                    "display_name": exchange["display_name"],
-                    "color": exchange["color"]
-                }
+                timeline_entry[exchange["name"]] = balance["amount"]
         
-        return {
-            "portfolio_timeline": portfolio_timeline,
-            "pnl_timeline": pnl_timeline,
-            "exchange_breakdown": exchange_breakdown
-        }
+        portfolio_timeline.append(timeline_entry)
+    
+    # Skip entries with 0 PnL (the first entry)
+    pnl_entries = [entry for entry in entries if entry["pnl_percentage"] != 0]
+    pnl_points = np.arange(len(pnl_entries))
+    if max_points and pnl_entries:
+        percentages = np.fromiter((entry["pnl_percentage"] for entry in entries), dtype=np.float64, count=len(entries))
+        pnl_days, percentages = days[percentages != 0], percentages[percentages != 0]
+        # Best and worst days always survive
+        pnl_points = lttb_indices(pnl_days, percentages, max_points, keep=[int(np.argmin(percentages)), int(np.argmax(percentages))])
+    
+    pnl_timeline = [{
+        "date": from_db_date(pnl_entries[i]["date"]).isoformat(),
+        "pnl_percentage": pnl_entries[i]["pnl_percentage"],
+        "pnl_amount": pnl_entries[i]["pnl_amount"]
+    } for i in pnl_points]
+    
+    # Latest exchange breakdown
+    latest = entries[-1]
+    exchange_breakdown = {}
+    for balance in latest["balances"]:
+        exchange = exchange_lookup.get(balance["exchange_id"])
+        if exchange:
+            exchange_breakdown[exchange["name"]] = {
+                "amount": balance["amount"],
+                "display_name": exchange["display_name"],
+                "color": exchange["color"]
+            }
+    
+    return {
+        "portfolio_timeline": portfolio_timeline,
+        "pnl_timeline": pnl_timeline,
+        "exchange_breakdown": exchange_breakdown
+    }
+
+# Only the fields build_chart_data reads
+CHART_ENTRY_PROJECTION = {"_id": 0, "date": 1, "balances": 1, "total": 1, "pnl_percentage": 1, "pnl_amount": 1}
+
+async def load_chart_entries(user_id: str) -> List[Dict]:
+    """Every entry in chain order, projected down to what the charts need"""
+    return await db.pnl_entries.find({"user_id": user_id}, CHART_ENTRY_PROJECTION).sort(
+        [("date", 1), ("id", 1)]
+    ).to_list(None)
+
+@api_router.get("/chart-data")
+async def get_chart_data(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(require_auth),
+    max_points: Optional[int] = None
+):
+    """Get data formatted for charts.
+
+    With `max_points` (at least 3), each timeline is downsampled to that many points
+    with Largest-Triangle-Three-Buckets, always keeping the highs, lows and the
+    deepest drawdown.
+    """
+    try:
+        if max_points is not None and max_points < 3:
+            raise HTTPException(status_code=400, detail="max_points must be at least 3")
+        not_modified = await not_modified_response(request, response, current_user.id)
+        if not_modified:
+            return not_modified
+        
+        entries, exchanges = await asyncio.gather(
+            load_chart_entries(current_user.id),
+            db.exchanges.find({"user_id": current_user.id, "is_active": True}).to_list(100)
+        )
+        return FastJSONResponse(build_chart_data(entries, exchanges, max_points), headers=dict(response.headers))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def recalculate_all_entries(user_id: str):
-    """Recalculate all entries for a specific user (used when KPIs change)"""
+@api_router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(require_auth),
+    limit: int = 100,
+    max_points: Optional[int] = None
+):
+    """Everything the dashboard loads, in one request.
+
+    Returns the payloads of /entries (first page of `limit`, with X-Next-Cursor
+    set the same way), /stats, /chart-data (with `max_points`),
+    /monthly-performance, /exchanges and /kpis. Each part makes the same bounded
+    read as its own endpoint; exchanges, KPIs and monthly rollups are read once
+    and shared, and every query runs concurrently. ETag-aware like the endpoints
+    it replaces.
+    """
     try:
-        # Get all entries for this user
-        entries = await db.pnl_entries.find({
-            "user_id": user_id
-        }).sort("date", 1).to_list(1000)
-        
-        # Get user's KPIs
-        user_kpis = await db.kpis.find({
-            "user_id": user_id,
-            "is_active": True
-        }).to_list(100)
+        if max_points is not None and max_points < 3:
+            raise HTTPException(status_code=400, detail="max_points must be at least 3")
+        limit = max(1, min(limit, 1000))
+        not_modified = await not_modified_response(request, response, current_user.id)
+        if not_modified:
+            return not_modified
+        
+        page, chart_entries, summary, exchanges, kpis, monthly_rollups, capital_totals = await asyncio.gather(
+            # Newest first, like /entries without a cursor; one extra row tells us if there's more
+            db.pnl_entries.find({"user_id": current_user.id}, ENTRY_READ_PROJECTION).sort(
+                [("date", -1), ("id", -1)]
+            ).limit(limit + 1).to_list(limit + 1),
+            load_chart_entries(current_user.id),
+            load_entry_summary(current_user.id),
+            db.exchanges.find({"user_id": current_user.id, "is_active": True}).sort("name", 1).to_list(100),
+            get_active_kpis(current_user.id),
+            get_monthly_rollups(current_user.id),
+            get_capital_totals(current_user.id)
+        )
+        if len(page) > limit:
+            page = page[:limit]
+            response.headers["X-Next-Cursor"] = encode_entry_cursor(page[-1])
+        
+        stats = build_stats(summary, monthly_rollups, capital_totals, kpis) if summary else empty_stats()
+        return FastJSONResponse({
+            "entries": [entry_response_dict(entry, kpis) for entry in page],
+            "stats": stats,
+            "chart_data": build_chart_data(chart_entries, exchanges, max_points),
+            "monthly_performance": build_monthly_performance(monthly_rollups),
+            "exchanges": [Exchange(**exchange).dict() for exchange in exchanges],
+            "kpis": [KPI(**kpi).dict() for kpi in kpis]
+        }, headers=dict(response.headers))
         
-        for i, entry in enumerate(entries):
-            # Calculate current total from balances
-            current_total = sum(balance["amount"] for balance in entry["balances"])
-            
-            # Get previous entry for PnL calculation
-            if i == 0:
-                previous_total = current_total  # First entry has no previous
-            else:
-                previous_total = entries[i-1]["total"]
-            
-            # Calculate new PnL metrics
-            pnl_metrics = calculate_pnl_metrics(current_total, previous_total)
-            
-            # Calculate KPI progress
-            kpi_progress = calculate_kpi_progress(current_total, user_kpis)
-            
-            # Update entry
-            await db.pnl_entries.update_one(
-                {"id": entry["id"], "user_id": user_id},
-                {"$set": {
-                    "total": round(current_total, 2),
-                    "kpi_progress": kpi_progress,
-                    **pnl_metrics
-                }}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/events")
+async def stream_events(request: Request, current_user: User = Depends(require_auth)):
+    """Server-sent events with a delta for each of the user's writes.
+
+    The first event is `ready` with the current data version. Every write sends
+    its type, the new version, the affected entries (and deleted ids) and fresh
+    stats; versions go up by one per write, so a gap means an event was missed.
+    A `resync` event means the client fell behind and should refetch /dashboard.
+    """
+    queue = event_broker.subscribe(current_user.id)
+    
+    async def stream():
+        try:
+            # Subscribed first, so no write can slip in between the version and the stream
+            yield format_sse({"type": "ready", "version": await get_data_version(current_user.id)})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(current_user.id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def cached_analytics(kind: Hashable, user_id: str, compute) -> Dict:
+    """Return a cached analytics report for the user's current data version, computing it on a miss"""
+    await recalculation_queue.wait(user_id)
+    key = (kind, user_id, await get_data_version(user_id))
+    report = analytics_cache.get(key)
+    if report is None:
+        report = await compute()
+        analytics_cache.set(key, report)
+    return report
+
+async def load_total_series(user_id: str) -> tuple:
+    """The user's (date ordinals, totals) in chain order as contiguous numpy arrays, from one cursor pass"""
+    entries = await db.pnl_entries.find(
+        {"user_id": user_id},
+        {"_id": 0, "date": 1, "total": 1}
+    ).sort([("date", 1), ("id", 1)]).to_list(None)
+    days = np.fromiter((from_db_date(entry["date"]).toordinal() for entry in entries), dtype=np.int64, count=len(entries))
+    totals = np.fromiter((entry["total"] for entry in entries), dtype=np.float64, count=len(entries))
+    return days, totals
+
+@api_router.get("/analytics/risk")
+async def get_risk_analytics(risk_free_rate: float = 0.0, current_user: User = Depends(require_auth)):
+    """Volatility, Sharpe/Sortino, max drawdown, Calmar ratio and recovery time of the portfolio total.
+
+    `risk_free_rate` is annual (0.04 for 4%). Reports are cached per data version.
+    """
+    try:
+        async def compute():
+            return risk_metrics(*await load_total_series(current_user.id), risk_free_rate=risk_free_rate)
+        return await cached_analytics(("risk", risk_free_rate), current_user.id, compute)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_capital_flows(user_id: str) -> tuple:
+    """The user's capital deposits as (date ordinals, amounts) numpy arrays, plus the skipped ones.
+
+    Deposits stored before deposit_date was validated may hold dates that aren't
+    ISO; they are left out of the flows and returned as (id, deposit_date) dicts.
+    """
+    deposits = await db.capital_deposits.find(
+        {"user_id": user_id},
+        {"_id": 0, "id": 1, "deposit_date": 1, "amount": 1}
+    ).to_list(None)
+    days, amounts, skipped = [], [], []
+    for deposit in deposits:
+        try:
+            days.append(from_db_date(deposit["deposit_date"]).toordinal())
+        except (TypeError, ValueError):
+            skipped.append({"id": deposit.get("id"), "deposit_date": deposit["deposit_date"]})
+            continue
+        amounts.append(deposit["amount"])
+    return np.array(days, dtype=np.int64), np.array(amounts, dtype=np.float64), skipped
+
+@api_router.get("/analytics/returns")
+async def get_returns_analytics(current_user: User = Depends(require_auth)):
+    """Flow-adjusted daily returns, time-weighted return and money-weighted return (XIRR).
+
+    Capital deposits are taken out of the day-to-day returns instead of counting
+    as profit; deposits with unreadable dates are listed under skipped_deposits.
+    Reports are cached per data version.
+    """
+    try:
+        async def compute():
+            (days, totals), (flow_days, flow_amounts, skipped) = await asyncio.gather(
+                load_total_series(current_user.id),
+                load_capital_flows(current_user.id)
             )
-            
+            return {**returns_report(days, totals, flow_days, flow_amounts), "skipped_deposits": skipped}
+        return await cached_analytics("returns", current_user.id, compute)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_exchange_balances(user_id: str) -> tuple:
+    """The user's (date ordinals, exchanges, balance matrix, starting balances) in chain order.
+
+    Columns are every exchange the user has, active or not, sorted by name, then
+    any exchange ids that only appear in entries. Entries are read in one cursor pass.
+    """
+    entries, exchanges, starting = await asyncio.gather(
+        db.pnl_entries.find(
+            {"user_id": user_id},
+            {"_id": 0, "date": 1, "balances": 1}
+        ).sort([("date", 1), ("id", 1)]).to_list(None),
+        db.exchanges.find(
+            {"user_id": user_id},
+            {"_id": 0, "id": 1, "name": 1, "display_name": 1, "color": 1, "is_active": 1}
+        ).sort("name", 1).to_list(1000),
+        db.exchange_starting_balances.find(
+            {"user_id": user_id},
+            {"_id": 0, "exchange_id": 1, "starting_balance": 1}
+        ).to_list(1000)
+    )
+    known = {exchange["id"] for exchange in exchanges}
+    unknown = {balance["exchange_id"] for entry in entries for balance in entry["balances"]} - known
+    exchanges.extend({"id": exchange_id, "name": exchange_id} for exchange_id in sorted(unknown))
+    column_index = {exchange["id"]: column for column, exchange in enumerate(exchanges)}
+    
+    days = np.fromiter((from_db_date(entry["date"]).toordinal() for entry in entries), dtype=np.int64, count=len(entries))
+    starting_balances = np.full(len(exchanges), np.nan)
+    for balance in starting:
+        column = column_index.get(balance["exchange_id"])
+        if column is not None:
+            starting_balances[column] = balance["starting_balance"]
+    return days, exchanges, balance_matrix(entries, column_index), starting_balances
+
+@api_router.get("/analytics/attribution")
+async def get_attribution_analytics(current_user: User = Depends(require_auth)):
+    """Per-exchange daily and cumulative PnL contribution, share of total return and ROI.
+
+    ROI is measured against each exchange's starting balance. Reports are cached
+    per data version.
+    """
+    try:
+        async def compute():
+            days, exchanges, balances, starting_balances = await load_exchange_balances(current_user.id)
+            report = attribution_report(days, balances, [exchange["id"] for exchange in exchanges], starting_balances)
+            for exchange, attribution in zip(exchanges, report["exchanges"]):
+                attribution.update({
+                    "name": exchange["name"],
+                    "display_name": exchange.get("display_name", exchange["name"]),
+                    "color": exchange.get("color"),
+                    "is_active": exchange.get("is_active", False)
+                })
+            return report
+        return await cached_analytics("attribution", current_user.id, compute)
     except Exception as e:
-        print(f"Error recalculating all entries: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def recalculate_all_entries(user_id: str):
+    """Queue a recalculation of all of the user's entries"""
+    await recalculation_queue.submit(user_id)
 
 # Starting Balance and Capital Deposit Management
 @api_router.get("/starting-balances")
@@ -1285,14 +1994,15 @@ async def set_starting_balance(balance_data: ExchangeStartingBalanceCreate, curr
         })
         
         if existing:
-            # Update existing
+            # Update existing, by the same (user_id, exchange_id) pair the user_exchange index covers
             await db.exchange_starting_balances.update_one(
-                {"id": existing["id"]},
+                {"user_id": current_user.id, "exchange_id": balance_data.exchange_id},
                 {"$set": {
                     "starting_balance": balance_data.starting_balance,
                     "starting_date": balance_data.starting_date
                 }}
             )
+            await record_write(current_user.id, "starting_balance.set", exchange_id=balance_data.exchange_id)
             return {"message": "Starting balance updated successfully"}
         else:
             # Create new
@@ -1303,6 +2013,7 @@ async def set_starting_balance(balance_data: ExchangeStartingBalanceCreate, curr
                 starting_date=balance_data.starting_date
             )
             await db.exchange_starting_balances.insert_one(starting_balance.dict())
+            await record_write(current_user.id, "starting_balance.set", exchange_id=balance_data.exchange_id)
             return {"message": "Starting balance set successfully"}
             
     except Exception as e:
@@ -1319,6 +2030,7 @@ async def delete_starting_balance(exchange_id: str, current_user: User = Depends
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Starting balance not found")
+        await record_write(current_user.id, "starting_balance.deleted", exchange_id=exchange_id)
         
         return {"message": "Starting balance deleted successfully"}
     except Exception as e:
@@ -1356,10 +2068,11 @@ async def add_capital_deposit(deposit_data: CapitalDepositCreate, current_user:
         deposit = CapitalDeposit(
             user_id=current_user.id,
             amount=deposit_data.amount,
-            deposit_date=deposit_data.deposit_date,
+            deposit_date=deposit_data.deposit_date.isoformat(),
             notes=deposit_data.notes or ""
         )
         await db.capital_deposits.insert_one(deposit.dict())
+        await record_write(current_user.id, "capital_deposit.created", deposit=deposit)
         return {"message": "Capital deposit added successfully", "deposit": deposit.dict()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1372,13 +2085,14 @@ async def update_capital_deposit(deposit_id: str, deposit_data: CapitalDepositCr
             {"user_id": current_user.id, "id": deposit_id},
             {"$set": {
                 "amount": deposit_data.amount,
-                "deposit_date": deposit_data.deposit_date,
+                "deposit_date": deposit_data.deposit_date.isoformat(),
                 "notes": deposit_data.notes or ""
             }}
         )
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Capital deposit not found")
+        await record_write(current_user.id, "capital_deposit.updated", deposit_id=deposit_id)
         
         return {"message": "Capital deposit updated successfully"}
     except Exception as e:
@@ -1395,48 +2109,271 @@ async def delete_capital_deposit(deposit_id: str, current_user: User = Depends(r
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Capital deposit not found")
+        await record_write(current_user.id, "capital_deposit.deleted", deposit_id=deposit_id)
         
         return {"message": "Capital deposit deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def recalculate_subsequent_entries(from_date: date, user_id: str):
-    """Recalculate PnL for entries from the given date onwards for a specific user"""
-    try:
-        # Get all entries from the date onwards for this user
-        entries = await db.pnl_entries.find({
-            "user_id": user_id,
-            "date": {"$gte": from_date.isoformat()}
-        }).sort("date", 1).to_list(1000)
-        
-        for i, entry in enumerate(entries):
-            # Calculate current total from balances
-            current_total = sum(balance["amount"] for balance in entry["balances"])
-            
-            # Get previous entry for PnL calculation
-            if i == 0:
-                previous_entry = await db.pnl_entries.find_one({
-                    "user_id": user_id,
-                    "date": {"$lt": entry["date"]}
-                }, sort=[("date", -1)])
-                previous_total = previous_entry["total"] if previous_entry else current_total
-            else:
-                previous_total = entries[i-1]["total"]
-            
-            # Calculate new PnL metrics
-            pnl_metrics = calculate_pnl_metrics(current_total, previous_total)
-            
-            # Update entry
-            await db.pnl_entries.update_one(
-                {"id": entry["id"], "user_id": user_id},
-                {"$set": {
-                    "total": round(current_total, 2),
-                    **pnl_metrics
-                }}
+# Fields needed to recompute an entry's place in the chain
+CHAIN_PROJECTION = {"_id": 0, "id": 1, "date": 1, "balances.amount": 1, "total": 1, "pnl_amount": 1, "pnl_percentage": 1}
+# Stored chain values that save_chain_updates expects to find unchanged before writing
+CHAIN_VALUE_FIELDS = ("total", "pnl_amount", "pnl_percentage")
+
+async def apply_rollup_deltas(user_id: str, deltas: Dict) -> None:
+    """$inc the user's monthly rollups by the given per-(year, month) deltas"""
+    if not deltas:
+        return
+    await db.pnl_monthly_rollups.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "year": year, "month": month},
+            {"$inc": delta},
+            upsert=True
+        )
+        for (year, month), delta in deltas.items()
+    ], ordered=False)
+
+async def save_chain_updates(user_id: str, entries_by_id: Dict[str, Dict], updates: Dict[str, Dict]) -> int:
+    """Write recomputed chain values and carry their PnL changes into the monthly rollups.
+
+    Each update only applies if the entry still holds the values it was computed
+    from, so a concurrent write is never overwritten with stale values. If any
+    entry changed in the meantime, the user's chain is queued for another pass
+    from the earliest skipped entry.
+    """
+    if not updates:
+        return 0
+    result = await db.pnl_entries.bulk_write(
+        [
+            UpdateOne(
+                {"id": entry_id, "user_id": user_id, **{field: entries_by_id[entry_id].get(field) for field in CHAIN_VALUE_FIELDS}},
+                {"$set": values}
             )
-            
-    except Exception as e:
-        print(f"Error recalculating entries: {e}")
+            for entry_id, values in updates.items()
+        ],
+        ordered=False
+    )
+
+    written = list(updates)
+    if result.matched_count < len(updates):
+        # Tell the written entries from the skipped ones by what they hold now
+        stored = {
+            entry["id"]: entry
+            for entry in await db.pnl_entries.find(
+                {"user_id": user_id, "id": {"$in": written}}, CHAIN_PROJECTION
+            ).to_list(None)
+        }
+        written = [
+            entry_id for entry_id, values in updates.items()
+            if all(stored.get(entry_id, {}).get(field) == value for field, value in values.items())
+        ]
+        skipped = [entries_by_id[entry_id]["date"] for entry_id in updates if entry_id not in written]
+        if len(written) > result.matched_count:
+            # A concurrent write stored the same values, so it's unclear whose change to count
+            await rebuild_monthly_rollups(user_id)
+            written = []
+        await recalculation_queue.submit(user_id, from_db_date(min(skipped)) if skipped else None)
+
+    before = [entries_by_id[entry_id] for entry_id in written]
+    after = [{**entries_by_id[entry_id], **updates[entry_id]} for entry_id in written]
+    await apply_rollup_deltas(user_id, rollup_deltas(before, after))
+    return result.modified_count
+
+async def rebuild_monthly_rollups(user_id: str) -> int:
+    """Recompute a user's monthly rollups from scratch; returns the number of months"""
+    pipeline = [
+        {"$match": {"user_id": user_id, "pnl_percentage": {"$ne": 0}}},
+        {"$group": {
+            "_id": {"year": {"$year": "$date"}, "month": {"$month": "$date"}},
+            "pnl_percentage_sum": {"$sum": "$pnl_percentage"},
+            "pnl_amount_sum": {"$sum": "$pnl_amount"},
+            "trading_days": {"$sum": 1}
+        }}
+    ]
+    months = {
+        (month["_id"]["year"], month["_id"]["month"]): {
+            "pnl_percentage_sum": round(month["pnl_percentage_sum"], ROLLUP_DECIMALS),
+            "pnl_amount_sum": round(month["pnl_amount_sum"], ROLLUP_DECIMALS),
+            "trading_days": month["trading_days"]
+        }
+        for month in await db.pnl_entries.aggregate(pipeline).to_list(None)
+    }
+    
+    if months:
+        await db.pnl_monthly_rollups.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "year": year, "month": month},
+                {"$set": sums},
+                upsert=True
+            )
+            for (year, month), sums in months.items()
+        ], ordered=False)
+    # Drop months that no longer have any trading days
+    await db.pnl_monthly_rollups.delete_many({
+        "user_id": user_id,
+        "$nor": [{"year": year, "month": month} for year, month in months] or [{"_id": None}]
+    })
+    return len(months)
+
+class RecalculationReport(BaseModel):
+    scanned: int = 0
+    modified: int = 0
+    elapsed_ms: float = 0.0
+    updated_ids: List[str] = []  # Entries whose total or PnL changed
+
+async def recalculate_chain(user_id: str, from_date: Optional[date] = None) -> RecalculationReport:
+    """Recompute total/PnL for a user's entries from `from_date` onwards in memory and
+    save the changed ones with a single unordered bulk_write"""
+    started = time.perf_counter()
+    
+    query = {"user_id": user_id}
+    previous_total = None
+    if from_date:
+        query["date"] = {"$gte": to_db_date(from_date)}
+        previous_entry = await db.pnl_entries.find_one(
+            {"user_id": user_id, "date": {"$lt": to_db_date(from_date)}},
+            {"_id": 0, "total": 1},
+            sort=[("date", -1), ("id", -1)]
+        )
+        if previous_entry:
+            previous_total = previous_entry["total"]
+    
+    entries = await db.pnl_entries.find(query, CHAIN_PROJECTION).sort([("date", 1), ("id", 1)]).to_list(None)
+    
+    updates = {update["id"]: update["set"] for update in compute_chain_updates(entries, previous_total)}
+    modified = await save_chain_updates(user_id, {entry["id"]: entry for entry in entries}, updates)
+    
+    report = RecalculationReport(
+        scanned=len(entries),
+        modified=modified,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        updated_ids=list(updates)
+    )
+    logger.info(f"Recalculated entries for user {user_id}: {report.modified}/{report.scanned} modified in {report.elapsed_ms}ms")
+    return report
+
+def entry_position_filter(user_id: str, entry_date: datetime, entry_id: str, op: str) -> Dict:
+    """Filter for entries on one side of a (date, id) chain position.
+    `op` ($lt, $gt or $gte) decides the side and applies to the id on the same date."""
+    date_op = "$lt" if op == "$lt" else "$gt"
+    return {"user_id": user_id, "$or": [
+        {"date": {date_op: entry_date}},
+        {"date": entry_date, "id": {op: entry_id}}
+    ]}
+
+async def find_previous_entry(user_id: str, entry_date: datetime, entry_id: str) -> Optional[Dict]:
+    """Get the entry just before a (date, id) chain position"""
+    return await db.pnl_entries.find_one(
+        entry_position_filter(user_id, entry_date, entry_id, "$lt"),
+        {"_id": 0, "id": 1, "total": 1},
+        sort=[("date", -1), ("id", -1)]
+    )
+
+async def propagate_entry_change(user_id: str, positions: List[tuple]) -> RecalculationReport:
+    """Incrementally recalculate PnL around changed (date, id) chain positions.
+
+    An entry's PnL only depends on its own total and its predecessor's, so a write
+    at a position can only change the entry now sitting there and the one right
+    after it. Each position costs two reads no matter how long the history is.
+    """
+    started = time.perf_counter()
+    
+    updates = {}
+    fetched = {}
+    for entry_date, entry_id in positions:
+        previous_entry = await find_previous_entry(user_id, entry_date, entry_id)
+        window = await db.pnl_entries.find(
+            entry_position_filter(user_id, entry_date, entry_id, "$gte"),
+            CHAIN_PROJECTION
+        ).sort([("date", 1), ("id", 1)]).limit(2).to_list(2)
+        for entry in window:
+            fetched.setdefault(entry["id"], entry)
+        
+        previous_total = previous_entry["total"] if previous_entry else None
+        for update in compute_chain_updates(window, previous_total):
+            updates[update["id"]] = update["set"]
+    
+    modified = await save_chain_updates(user_id, fetched, updates)
+    scanned = len(fetched)
+    
+    return RecalculationReport(
+        scanned=scanned,
+        modified=modified,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        updated_ids=list(updates)
+    )
+
+# Documents per insert_many call when writing entries in bulk
+INSERT_BATCH_SIZE = 500
+
+def new_entry_document(user_id: str, entry_data: PnLEntryCreate) -> Dict:
+    """Stored form of a new entry, before its PnL is known"""
+    entry = PnLEntry(date=entry_data.date, balances=entry_data.balances, notes=entry_data.notes)
+    entry_dict = entry.dict()
+    entry_dict["date"] = to_db_date(entry_dict["date"])
+    entry_dict["balances"] = [balance.dict() for balance in entry.balances]
+    entry_dict["total"] = entry_total(entry_dict["balances"])
+    del entry_dict["kpi_progress"]
+    entry_dict["user_id"] = user_id
+    return entry_dict
+
+async def insert_entries_bulk(user_id: str, entries_data: List[PnLEntryCreate]) -> List[Dict]:
+    """Insert many entries with one chain pass instead of one recalculation per entry.
+
+    A stored entry's PnL only changes if a new entry lands right before it, so the
+    new entries are merged in memory with the stored entries between the first and
+    last new position plus the one just after, and the chain is computed once,
+    seeded from the single stored entry before it. New entries are inserted with
+    their final PnL in batches, and only the stored entries whose PnL changed are
+    rewritten. The number of round trips doesn't depend on how many entries are
+    inserted. Returns the inserted documents in the order they were given.
+    """
+    if not entries_data:
+        return []
+    documents = [new_entry_document(user_id, entry_data) for entry_data in entries_data]
+    first = min(documents, key=lambda entry: (entry["date"], entry["id"]))
+    last = max(documents, key=lambda entry: (entry["date"], entry["id"]))
+    previous_entry, stored, next_entry = await asyncio.gather(
+        find_previous_entry(user_id, first["date"], first["id"]),
+        db.pnl_entries.find(
+            {"$and": [
+                entry_position_filter(user_id, first["date"], first["id"], "$gt"),
+                entry_position_filter(user_id, last["date"], last["id"], "$lt")
+            ]},
+            CHAIN_PROJECTION
+        ).sort([("date", 1), ("id", 1)]).to_list(None),
+        db.pnl_entries.find_one(
+            entry_position_filter(user_id, last["date"], last["id"], "$gt"),
+            CHAIN_PROJECTION,
+            sort=[("date", 1), ("id", 1)]
+        )
+    )
+    if next_entry:
+        stored.append(next_entry)
+    
+    chain = sorted(documents + stored, key=lambda entry: (entry["date"], entry["id"]))
+    previous_total = previous_entry["total"] if previous_entry else None
+    updates = {update["id"]: update["set"] for update in compute_chain_updates(chain, previous_total)}
+    for document in documents:
+        document.update(updates.pop(document["id"], {}))
+    
+    for start in range(0, len(documents), INSERT_BATCH_SIZE):
+        await db.pnl_entries.insert_many(documents[start:start + INSERT_BATCH_SIZE])
+    await apply_rollup_deltas(user_id, rollup_deltas([], documents))
+    # What's left in updates belongs to stored entries that now follow a new one
+    await save_chain_updates(user_id, {entry["id"]: entry for entry in stored}, updates)
+    return documents
+
+async def recalculate_subsequent_entries(from_date: date, user_id: str):
+    """Queue a recalculation of the user's entries from the given date onwards"""
+    await recalculation_queue.submit(user_id, from_date)
+
+async def run_recalculation(user_id: str, from_date: Optional[date]) -> RecalculationReport:
+    """Queued full-chain recalculation; publishes the result when anything changed"""
+    report = await recalculate_chain(user_id, from_date)
+    if report.modified:
+        await record_write(user_id, "entries.recalculated", modified=report.modified)
+    return report
 
 # Include the router in the main app with /api prefix
 app.include_router(api_router, prefix="/api")
@@ -1447,6 +2384,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Configure logging
@@ -1456,6 +2394,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_http_client():
+    await http_client.start()
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def start_recalculation_queue():
+    recalculation_queue.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await recalculation_queue.drain(RECALC_DRAIN_TIMEOUT_SECONDS)
+    client.close()
+    google_verifier.close()
+    await http_client.close()
\ No newline at end of file
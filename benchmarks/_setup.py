@@ -0,0 +1,111 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks need a real MongoDB: set BENCH_MONGO_URL (defaults to a local mongod).
+Each run seeds a throwaway database and drops it afterwards.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+os.environ.setdefault("MONGO_URL", os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+os.environ.setdefault("DB_NAME", "crypto_pnl_bench")
+
+import server  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from pnl_engine import compute_chain_updates  # noqa: E402
+
+EXCHANGE_IDS = ["kraken", "bitget", "binance"]
+
+
+def make_entries(user_id: str, entry_count: int, seed: int = 7) -> list:
+    """`entry_count` consecutive daily entry documents ending today, with a consistent PnL chain"""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=entry_count)
+    balances = {exchange_id: 1000.0 for exchange_id in EXCHANGE_IDS}
+    entries = []
+    for day in range(entry_count):
+        for exchange_id in EXCHANGE_IDS:
+            balances[exchange_id] = round(max(0.0, balances[exchange_id] * (1 + rng.gauss(0.001, 0.02))), 2)
+        entries.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "date": server.to_db_date(start + timedelta(days=day)),
+            "balances": [{"exchange_id": exchange_id, "amount": amount} for exchange_id, amount in balances.items()],
+            "total": 0.0,
+            "pnl_amount": 0.0,
+            "pnl_percentage": 0.0,
+            "notes": "",
+            "created_at": datetime.utcnow()
+        })
+    entries_by_id = {entry["id"]: entry for entry in entries}
+    for update in compute_chain_updates(entries):
+        entries_by_id[update["id"]].update(update["set"])
+    return entries
+
+
+async def seed_user(entry_count: int, seed: int = 7) -> server.User:
+    """Create a user with `entry_count` daily entries, their monthly rollups, deposits and KPIs"""
+    await server.client.drop_database(os.environ["DB_NAME"])
+    await ensure_indexes(server.db)
+
+    user = server.User(email="bench@example.com", name="Bench")
+    await server.db.users.insert_one(user.dict())
+
+    start = date.today() - timedelta(days=entry_count)
+    await server.db.pnl_entries.insert_many(make_entries(user.id, entry_count, seed))
+    # Same backfill as `manage.py rebuild-rollups`; /stats and /monthly-performance read these
+    await server.rebuild_monthly_rollups(user.id)
+
+    await server.db.capital_deposits.insert_many([
+        {"id": str(uuid.uuid4()), "user_id": user.id, "amount": 1000.0,
+         "deposit_date": (start + timedelta(days=day)).isoformat(), "notes": ""}
+        for day in range(0, entry_count, 30)
+    ])
+    await server.db.exchange_starting_balances.insert_many([
+        {"id": str(uuid.uuid4()), "user_id": user.id, "exchange_id": exchange_id,
+         "starting_balance": 1000.0, "starting_date": start.isoformat()}
+        for exchange_id in EXCHANGE_IDS
+    ])
+    for target in (5000, 10000, 15000):
+        kpi = server.KPI(name=f"{target // 1000}K Goal", target_amount=target)
+        await server.db.kpis.insert_one({**kpi.dict(), "user_id": user.id})
+    return user
+
+
+async def drop_database():
+    await server.client.drop_database(os.environ["DB_NAME"])
+
+
+async def time_async(fn, repeat: int = 20) -> float:
+    """Median wall time of `await fn()` in milliseconds, after one warm-up call"""
+    await fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def time_sync(fn, repeat: int = 20) -> float:
+    """Median wall time of `fn()` in milliseconds, after one warm-up call"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def report(name: str, before_ms: float, after_ms: float) -> None:
+    print(f"{name}: before {before_ms:.1f} ms, after {after_ms:.1f} ms, speedup {before_ms / after_ms:.1f}x")
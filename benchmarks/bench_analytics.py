@@ -0,0 +1,38 @@
+"""
+Analytics engine compute time on a 10k-entry history, arrays already loaded.
+No database is needed.
+
+    python benchmarks/bench_analytics.py
+"""
+
+import numpy as np
+
+from _setup import EXCHANGE_IDS, make_entries, server, time_sync
+from analytics import attribution_report, returns_report, risk_metrics
+from columnar import balance_matrix
+
+ENTRY_COUNT = 10_000
+
+
+def main():
+    entries = make_entries("bench-user", ENTRY_COUNT)
+    days = np.fromiter((server.from_db_date(entry["date"]).toordinal() for entry in entries), dtype=np.int64)
+    totals = np.fromiter((entry["total"] for entry in entries), dtype=np.float64)
+
+    column_index = {exchange_id: column for column, exchange_id in enumerate(EXCHANGE_IDS)}
+    starting_balances = np.full(len(EXCHANGE_IDS), 1000.0)
+
+    # A deposit every 30 days
+    flow_days, flow_amounts = days[::30].copy(), np.full(len(days[::30]), 1000.0)
+
+    print(f"risk_metrics on {ENTRY_COUNT} entries: {time_sync(lambda: risk_metrics(days, totals)):.2f} ms")
+    print(f"returns_report on {ENTRY_COUNT} entries: "
+          f"{time_sync(lambda: returns_report(days, totals, flow_days, flow_amounts)):.2f} ms")
+    print(f"balance_matrix on {ENTRY_COUNT} entries: {time_sync(lambda: balance_matrix(entries, column_index)):.2f} ms")
+    balances = balance_matrix(entries, column_index)
+    print(f"attribution_report on {ENTRY_COUNT} entries: "
+          f"{time_sync(lambda: attribution_report(days, balances, EXCHANGE_IDS, starting_balances)):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
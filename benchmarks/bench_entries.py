@@ -0,0 +1,67 @@
+"""
+GET /entries with 1k-entry pages: per-entry Pydantic models validated through
+response_model (before) vs projected documents encoded with orjson (after).
+Both run through the full ASGI stack, so the numbers are requests per second.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_entries.py
+"""
+
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from _setup import drop_database, seed_user, server
+
+ENTRY_COUNT = 5_000
+PAGE_SIZE = 1_000
+REQUESTS = 50
+
+
+async def legacy_entries(current_user: server.User = Depends(server.require_auth), limit: int = 100):
+    """The model-building read path /entries used before the fast path"""
+    entries = await server.db.pnl_entries.find({"user_id": current_user.id}).sort(
+        [("date", -1), ("id", -1)]
+    ).limit(limit).to_list(limit)
+    user_kpis = await server.get_active_kpis(current_user.id)
+    result = []
+    for entry in entries:
+        entry["date"] = server.from_db_date(entry["date"])
+        entry["balances"] = [server.DynamicBalance(**balance) for balance in entry["balances"]]
+        entry["kpi_progress"] = [
+            server.DynamicKPI(**kpi) for kpi in server.calculate_kpi_progress(entry["total"], user_kpis)
+        ]
+        result.append(server.PnLEntry(**entry))
+    return result
+
+
+async def requests_per_second(app, url: str) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        (await client.get(url)).raise_for_status()
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = await client.get(url)
+            assert len(response.json()) == PAGE_SIZE
+        return REQUESTS / (time.perf_counter() - started)
+
+
+async def main():
+    user = await seed_user(ENTRY_COUNT)
+    legacy_app = FastAPI()
+    legacy_app.get("/api/entries", response_model=List[server.PnLEntry])(legacy_entries)
+    for app in (legacy_app, server.app):
+        app.dependency_overrides[server.require_auth] = lambda: user
+    try:
+        before = await requests_per_second(legacy_app, f"/api/entries?limit={PAGE_SIZE}")
+        after = await requests_per_second(server.app, f"/api/entries?limit={PAGE_SIZE}")
+        print(f"/entries, {PAGE_SIZE}-entry pages: before {before:.1f} req/s, after {after:.1f} req/s, "
+              f"speedup {after / before:.1f}x")
+    finally:
+        await drop_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Response serialization per endpoint: FastAPI's default path, jsonable_encoder into
+JSONResponse (before), vs FastJSONResponse the way each route now uses it (after).
+Payloads are built in memory, so no MongoDB is needed.
+
+    python benchmarks/bench_serialization.py
+"""
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from _setup import make_entries, report, server, time_sync
+from json_response import FastJSONResponse
+from pnl_engine import rollup_deltas
+
+ENTRY_COUNT = 3_000
+PAGE_SIZE = 1_000
+
+
+def build_payloads():
+    entries = make_entries("bench-user", ENTRY_COUNT)
+    exchanges = [
+        {"id": exchange_id, "name": exchange_id, "display_name": exchange_id.title(), "color": "#000000"}
+        for exchange_id in {balance["exchange_id"] for balance in entries[0]["balances"]}
+    ]
+    kpis = [{"id": f"kpi-{target}", "target_amount": target} for target in (5000, 10000, 15000)]
+    rollups = sorted(
+        ({"year": year, "month": month, **sums} for (year, month), sums in rollup_deltas([], entries).items()),
+        key=lambda rollup: (rollup["year"], rollup["month"]),
+        reverse=True
+    )
+    stats = {**server.empty_stats(), "total_entries": ENTRY_COUNT, "total_balance": entries[-1]["total"]}
+    page = [server.entry_response_dict(entry, kpis) for entry in reversed(entries[-PAGE_SIZE:])]
+    return {
+        # (content, whether the route hands it to the response class directly)
+        "/entries": (page, True),
+        "/chart-data": (server.build_chart_data(entries, exchanges), True),
+        "/chart-data?max_points=500": (server.build_chart_data(entries, exchanges, 500), True),
+        "/monthly-performance": (server.build_monthly_performance(rollups), False),
+        "/stats": (stats, False),
+    }
+
+
+def main():
+    for endpoint, (content, direct) in build_payloads().items():
+        before = time_sync(lambda: JSONResponse(jsonable_encoder(content)).body)
+        if direct:
+            after = time_sync(lambda: FastJSONResponse(content).body)
+        else:
+            after = time_sync(lambda: FastJSONResponse(jsonable_encoder(content)).body)
+        report(f"{endpoint} serialization", before, after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+/stats: sequential queries (before) vs one $facet pass plus concurrent sums (after).
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_stats.py
+"""
+
+import asyncio
+
+from fastapi import Request, Response
+
+from _setup import drop_database, report, seed_user, server, time_async
+
+ENTRY_COUNT = 10_000
+
+
+async def legacy_stats(user_id: str) -> dict:
+    """The query sequence /stats issued before the $facet rewrite"""
+    db = server.db
+    latest_entry = await db.pnl_entries.find_one({"user_id": user_id}, sort=[("date", -1)])
+    await db.pnl_entries.count_documents({"user_id": user_id})
+    deposits = await db.capital_deposits.find({"user_id": user_id}).to_list(length=None)
+    starting = await db.exchange_starting_balances.find({"user_id": user_id}).to_list(length=None)
+    for pipeline in (
+        [{"$match": {"user_id": user_id, "pnl_amount": {"$ne": 0}}},
+         {"$group": {"_id": None, "avg_pnl": {"$avg": "$pnl_amount"}}}],
+        [{"$match": {"user_id": user_id, "pnl_percentage": {"$ne": 0}}},
+         {"$group": {"_id": None, "avg_pnl_pct": {"$avg": "$pnl_percentage"}}}],
+        [{"$match": {"user_id": user_id, "pnl_percentage": {"$ne": 0}}},
+         # Entry dates are BSON dates now, so this reads date parts directly
+         {"$addFields": {"year": {"$year": "$date"}, "month": {"$month": "$date"}}},
+         {"$group": {"_id": {"year": "$year", "month": "$month"}, "monthly_pnl": {"$sum": "$pnl_percentage"}}},
+         {"$group": {"_id": None, "avg_monthly_pnl": {"$avg": "$monthly_pnl"}}}],
+    ):
+        await db.pnl_entries.aggregate(pipeline).to_list(1)
+    await db.kpis.find({"user_id": user_id, "is_active": True}).to_list(100)
+    return {"latest": latest_entry, "deposits": len(deposits), "starting": len(starting)}
+
+
+async def main():
+    user = await seed_user(ENTRY_COUNT)
+    try:
+        before = await time_async(lambda: legacy_stats(user.id))
+        after = await time_async(lambda: server.get_portfolio_stats(
+            Request({"type": "http", "headers": []}), Response(), current_user=user
+        ))
+        report(f"/stats on {ENTRY_COUNT} entries", before, after)
+        # Guard against timing the rollup path on empty rollups
+        assert (await server.load_stats(user.id))["avg_monthly_pnl_percentage"] != 0
+    finally:
+        await drop_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
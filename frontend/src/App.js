@@ -29,6 +29,8 @@ ChartJS.register(
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Timeline points requested for the charts; more than a chart can usefully draw
+const CHART_MAX_POINTS = 500;
 
 // Authentication Context
 const AuthContext = createContext();
@@ -324,24 +326,19 @@ const CryptoPnLTracker = () => {
       // Initialize defaults first
       await initializeDefaults();
       
-      const [entriesRes, statsRes, chartRes, monthlyRes, exchangesRes, kpisRes] = await Promise.all([
-        axios.get(`${API}/entries`),
-        axios.get(`${API}/stats`),
-        axios.get(`${API}/chart-data`),
-        axios.get(`${API}/monthly-performance`),
-        axios.get(`${API}/exchanges`),
-        axios.get(`${API}/kpis`)
-      ]);
+      const { data } = await axios.get(`${API}/dashboard`, {
+        params: { max_points: CHART_MAX_POINTS }
+      });
       
-      setEntries(entriesRes.data);
-      setStats(statsRes.data);
-      setChartData(chartRes.data);
-      setMonthlyPerformance(monthlyRes.data);
-      setExchanges(exchangesRes.data);
-      setKPIs(kpisRes.data);
+      setEntries(data.entries);
+      setStats(data.stats);
+      setChartData(data.chart_data);
+      setMonthlyPerformance(data.monthly_performance);
+      setExchanges(data.exchanges);
+      setKPIs(data.kpis);
       
       // Initialize form balances with exchanges
-      const initialBalances = exchangesRes.data.map(exchange => ({
+      const initialBalances = data.exchanges.map(exchange => ({
         exchange_id: exchange.id,
         amount: 0
       }));
@@ -0,0 +1,36 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import time; tests swap in their own database
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "crypto_pnl_test")
+
+
+@pytest.fixture
+def mongo_db():
+    """Point server.db at a fresh mongomock database; the real one is put back afterwards"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import server
+
+    original = server.db
+    server.db = mongomock_motor.AsyncMongoMockClient()["crypto_pnl_test"]
+    yield server.db
+    server.db = original
+
+
+@pytest.fixture
+def api(mongo_db):
+    """A TestClient signed in as a new user through a require_auth override"""
+    from fastapi.testclient import TestClient
+    import server
+
+    user = server.User(email="test@example.com", name="Test")
+    server.app.dependency_overrides[server.require_auth] = lambda: user
+    yield TestClient(server.app), user
+    server.app.dependency_overrides.clear()
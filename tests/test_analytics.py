@@ -0,0 +1,171 @@
+"""
+Analytics engines against straightforward per-element reference computations.
+"""
+
+import asyncio
+import math
+import statistics
+from datetime import date
+
+import numpy as np
+import pytest
+
+from analytics import attribution_report, flow_adjusted_returns, max_drawdown, returns_report, risk_metrics, xirr
+
+START = date(2024, 1, 1).toordinal()
+
+
+def random_series(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.arange(START, START + n), 10000 * np.cumprod(1 + rng.normal(0.001, 0.03, n))
+
+
+def test_risk_metrics_match_reference():
+    days, totals = random_series(500, 3)
+    report = risk_metrics(days, totals, risk_free_rate=0.04)
+
+    returns = [totals[i] / totals[i - 1] - 1 for i in range(1, len(totals))]
+    daily_risk_free = 1.04 ** (1 / 365) - 1
+    excess = statistics.mean(returns) - daily_risk_free
+    volatility = statistics.stdev(returns)
+    downside = math.sqrt(sum(min(r - daily_risk_free, 0) ** 2 for r in returns) / len(returns))
+
+    assert report["entries"] == 500
+    assert report["daily_volatility"] == pytest.approx(volatility * 100, abs=0.006)
+    assert report["sharpe_ratio"] == pytest.approx(excess / volatility * math.sqrt(365), abs=0.006)
+    assert report["sortino_ratio"] == pytest.approx(excess / downside * math.sqrt(365), abs=0.006)
+
+
+def test_max_drawdown_dates_and_recovery():
+    totals = np.array([100, 120, 90, 130, 65, 100, 129, 131, 80], dtype=float)
+    days = np.arange(START, START + len(totals))
+
+    assert max_drawdown(totals) == {"depth": 65 / 130 - 1, "peak": 3, "trough": 4, "recovery": 7}
+    report = risk_metrics(days, totals)
+    assert report["max_drawdown"] == -50.0
+    assert (report["max_drawdown_peak_date"], report["max_drawdown_trough_date"]) == ("2024-01-04", "2024-01-05")
+    assert (report["recovery_date"], report["recovery_days"]) == ("2024-01-08", 3)
+
+
+def test_short_and_flat_series_leave_metrics_undefined():
+    assert risk_metrics(np.array([START]), np.array([100.0]))["sharpe_ratio"] is None
+    flat = risk_metrics(np.arange(START, START + 5), np.full(5, 100.0))
+    assert flat["max_drawdown"] == 0.0 and flat["sharpe_ratio"] is None and flat["recovery_date"] is None
+
+
+def reference_xirr(days, amounts):
+    """Bisection on the NPV, one rate at a time"""
+    def npv(rate):
+        return sum(amount / (1 + rate) ** ((day - days[0]) / 365) for day, amount in zip(days, amounts))
+    low, high = -0.99, 100.0
+    for _ in range(200):
+        middle = (low + high) / 2
+        if (npv(low) > 0) == (npv(middle) > 0):
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def test_xirr_matches_bisection():
+    rng = np.random.default_rng(5)
+    for _ in range(20):
+        days = np.sort(START + rng.choice(1000, size=6, replace=False))
+        deposits = rng.uniform(100, 1000, 5)
+        amounts = np.append(-deposits, deposits.sum() * rng.uniform(0.6, 2.5))
+        assert xirr(days, amounts) == pytest.approx(reference_xirr(days.tolist(), amounts.tolist()), abs=1e-7)
+    assert xirr(np.array([START, START + 365]), np.array([-100.0, 110.0])) == pytest.approx(0.1)
+    assert xirr(np.array([START, START + 365]), np.array([100.0, 110.0])) is None
+
+
+def test_deposits_are_not_counted_as_returns():
+    days = np.arange(START, START + 4)
+    totals = np.array([1000.0, 1100.0, 2200.0, 2420.0])
+    # 1000 deposited before the first entry (already in it) and 1000 during day three
+    flow_days, flow_amounts = np.array([START - 10, START + 2]), np.array([1000.0, 1000.0])
+
+    assert flow_adjusted_returns(days, totals, flow_days, flow_amounts) == pytest.approx([0.1, 0.1 / 2.1, 0.1])
+    report = returns_report(days, totals, flow_days, flow_amounts)
+    assert report["net_flows"] == 1000.0 and report["total_deposited"] == 2000.0
+    assert report["profit"] == 420.0
+    assert report["time_weighted_return"] == pytest.approx((1.1 * (2200 / 2100) * 1.1 - 1) * 100, abs=0.006)
+    assert len(report["daily_returns"]) == 3
+
+
+def test_attribution_matches_per_cell_reference():
+    rng = np.random.default_rng(9)
+    days = np.arange(START, START + 60)
+    balances = rng.uniform(100, 1000, (60, 3))
+    balances[:20, 1] = np.nan  # added on day 21
+    balances[45:, 2] = np.nan  # removed after day 45
+    report = attribution_report(days, balances, ["a", "b", "c"], np.array([500.0, np.nan, 0.0]))
+
+    filled = [[0.0 if math.isnan(value) else value for value in row] for row in balances.tolist()]
+    totals = [sum(row) for row in filled]
+    for column, exchange in enumerate(report["exchanges"]):
+        expected = [0.0] + [filled[i][column] - filled[i - 1][column] for i in range(1, len(filled))]
+        assert exchange["daily_contribution"] == pytest.approx(expected, abs=0.006)
+        assert exchange["contribution"] == pytest.approx(filled[-1][column] - filled[0][column], abs=0.006)
+    assert report["total_pnl"] == pytest.approx(totals[-1] - totals[0], abs=0.006)
+    assert sum(exchange["share_of_return"] for exchange in report["exchanges"]) == pytest.approx(100, abs=0.02)
+
+    a, b, c = report["exchanges"]
+    assert a["roi"] == pytest.approx((balances[-1, 0] - 500) / 5, abs=0.006)
+    assert b["roi"] is None and c["roi"] is None
+    assert (b["first_date"], c["last_date"]) == ("2024-01-21", "2024-02-14")
+    assert c["current_balance"] == 0.0 and c["cumulative_contribution"][-1] == round(-balances[0, 2], 2)
+
+
+def test_risk_report_is_cached_per_data_version(mongo_db):
+    import server
+
+    async def run():
+        user = server.User(email="risk@example.com", name="Risk")
+        for day, amount in ((1, 100), (2, 110), (3, 99)):
+            await server.create_pnl_entry(server.PnLEntryCreate(
+                date=date(2024, 1, day), balances=[server.DynamicBalance(exchange_id="kraken", amount=amount)]
+            ), current_user=user)
+
+        first = await server.get_risk_analytics(current_user=user)
+        hits = server.analytics_cache.hits
+        assert await server.get_risk_analytics(current_user=user) is first
+        assert server.analytics_cache.hits == hits + 1
+
+        await server.create_pnl_entry(server.PnLEntryCreate(
+            date=date(2024, 1, 4), balances=[server.DynamicBalance(exchange_id="kraken", amount=120)]
+        ), current_user=user)
+        second = await server.get_risk_analytics(current_user=user)
+        assert second["entries"] == 4 and first["entries"] == 3
+
+        await server.create_pnl_entry(server.PnLEntryCreate(date=date(2024, 1, 5), balances=[
+            server.DynamicBalance(exchange_id="kraken", amount=100), server.DynamicBalance(exchange_id="bitget", amount=50)
+        ]), current_user=user)
+        attribution = await server.get_attribution_analytics(current_user=user)
+        assert [exchange["exchange_id"] for exchange in attribution["exchanges"]] == ["bitget", "kraken"]
+        assert attribution["total_pnl"] == 50.0
+        assert [exchange["contribution"] for exchange in attribution["exchanges"]] == [50.0, 0.0]
+
+    asyncio.run(run())
+
+
+def test_returns_skip_deposits_with_unreadable_dates(api):
+    import server
+
+    client, user = api
+    kraken = client.post("/api/exchanges", json={"name": "kraken", "display_name": "Kraken", "color": "#000"}).json()
+    for day, amount in ((1, 1000), (2, 1100)):
+        client.post("/api/entries", json={"date": f"2024-05-0{day}", "balances": [{"exchange_id": kraken["id"], "amount": amount}]})
+
+    assert client.post("/api/capital-deposits", json={"amount": 500, "deposit_date": "01/02/2024"}).status_code == 422
+    assert client.post("/api/capital-deposits", json={"amount": 1000, "deposit_date": "2024-04-01"}).status_code == 200
+    # Written before deposit_date was validated
+    asyncio.run(server.db.capital_deposits.insert_one(
+        {"id": "legacy", "user_id": user.id, "amount": 500.0, "deposit_date": "01/02/2024", "notes": ""}
+    ))
+    asyncio.run(server.record_write(user.id, "capital_deposit.created"))
+
+    response = client.get("/api/analytics/returns")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["skipped_deposits"] == [{"id": "legacy", "deposit_date": "01/02/2024"}]
+    assert report["total_deposited"] == 1000.0
@@ -0,0 +1,59 @@
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("token", "user")
+
+    clock.now = 29
+    assert cache.get("token") == "user"
+    clock.now = 30
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_cannot_exceed_cache_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("short", "a", ttl=5)
+    cache.set("long", "b", ttl=3600)
+    cache.set("expired", "c", ttl=-1)
+
+    clock.now = 10
+    assert cache.get("short") is None
+    assert cache.get("long") == "b"
+    assert cache.get("expired") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_invalidate_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("token", "user")
+    assert cache.get("token") == "user"
+    cache.invalidate("token")
+    assert cache.get("token") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,66 @@
+"""
+ETags follow the per-user data version: unchanged data answers If-None-Match with
+304, and every write path moves the version on.
+"""
+
+from datetime import date
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server
+
+READ_PATHS = ["/api/entries", "/api/stats", "/api/chart-data", "/api/monthly-performance", "/api/dashboard"]
+
+
+def test_unchanged_data_is_not_modified(api):
+    client, _ = api
+    for path in READ_PATHS:
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        again = client.get(path, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["ETag"] == etag
+        assert again.content == b""
+
+
+def test_write_paths_bump_the_version(api):
+    client, _ = api
+    etag = client.get("/api/entries").headers["ETag"]
+
+    def assert_changed():
+        nonlocal etag
+        response = client.get("/api/entries", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+    exchange = client.post("/api/exchanges", json={"name": "kraken", "display_name": "Kraken", "color": "#000"}).json()
+    assert_changed()
+    kpi = client.post("/api/kpis", json={"name": "Goal", "target_amount": 5000, "color": "#000"}).json()
+    assert_changed()
+    entry = client.post("/api/entries", json={
+        "date": date(2024, 1, 2).isoformat(),
+        "balances": [{"exchange_id": exchange["id"], "amount": 100}]
+    }).json()
+    assert_changed()
+    client.put(f"/api/entries/{entry['id']}", json={"balances": [{"exchange_id": exchange["id"], "amount": 120}]})
+    assert_changed()
+    client.post("/api/capital-deposits", json={"amount": 50, "deposit_date": "2024-01-01"})
+    assert_changed()
+    client.post("/api/starting-balances", json={"exchange_id": exchange["id"], "starting_balance": 80, "starting_date": "2024-01-01"})
+    assert_changed()
+    client.delete(f"/api/kpis/{kpi['id']}")
+    assert_changed()
+    client.delete(f"/api/entries/{entry['id']}")
+    assert_changed()
+
+
+def test_etags_are_per_user():
+    assert server.data_etag("user-a", 3) != server.data_etag("user-b", 3)
+    assert server.etag_matches('"abc", W/"x-1"', 'W/"x-1"')
+    assert server.etag_matches("*", 'W/"x-1"')
+    assert not server.etag_matches('W/"x-2"', 'W/"x-1"')
+    assert not server.etag_matches(None, 'W/"x-1"')
@@ -0,0 +1,156 @@
+"""
+/import/csv: the export layout round-trips, imports interleaved with stored
+entries leave the chain and rollups exactly as a full recalculation would, and
+bad files are rejected without writing anything.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server
+from pnl_engine import compute_chain_updates, rollup_deltas
+
+
+def make_user(client, name):
+    user = server.User(email=f"{name}@example.com", name=name)
+    server.app.dependency_overrides[server.require_auth] = lambda: user
+    exchanges = {
+        display_name: client.post("/api/exchanges", json={
+            "name": display_name.lower(), "display_name": display_name, "color": "#000"
+        }).json()["id"]
+        for display_name in ("Kraken", "Binance")
+    }
+    return user, exchanges
+
+
+def import_csv(client, text, dry_run=False):
+    return client.post(
+        "/api/import/csv",
+        params={"dry_run": dry_run},
+        files={"file": ("entries.csv", text.encode(), "text/csv")}
+    )
+
+
+async def stored_entries(user):
+    return await server.db.pnl_entries.find({"user_id": user.id}).sort([("date", 1), ("id", 1)]).to_list(None)
+
+
+def assert_consistent(user):
+    entries = asyncio.run(stored_entries(user))
+    rollups = asyncio.run(server.db.pnl_monthly_rollups.find({"user_id": user.id}).to_list(None))
+    assert compute_chain_updates(entries) == []
+    expected = rollup_deltas([], entries)
+    actual = {(r["year"], r["month"]): r for r in rollups if r["trading_days"]}
+    assert set(actual) == set(expected)
+    for month, sums in expected.items():
+        assert actual[month]["trading_days"] == sums["trading_days"]
+        assert actual[month]["pnl_amount_sum"] == pytest.approx(sums["pnl_amount_sum"], abs=1e-6)
+    return entries
+
+
+@pytest.fixture
+def client(api):
+    return api[0]
+
+
+def test_import_interleaves_with_stored_entries(client):
+    user, exchanges = make_user(client, "interleave")
+    for day, amount in ((10, 1000), (20, 1100), (30, 900)):
+        client.post("/api/entries", json={
+            "date": f"2024-01-{day}", "balances": [{"exchange_id": exchanges["Kraken"], "amount": amount}]
+        })
+
+    csv_text = (
+        "Date,Kraken,Binance,Total,PnL %,PnL €,KPI 5K Goal,Notes\n"
+        "2024-01-05,500.00,100.00,0,0,0,0,first\n"
+        "2024-01-15,1200.00,,0,0,0,0,\n"
+        "2024-01-25,800.00,50.00,0,0,0,0,\n"
+        "2024-02-05,950.00,0.00,0,0,0,0,last\n"
+    )
+    response = import_csv(client, csv_text)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 4
+
+    entries = assert_consistent(user)
+    assert [server.from_db_date(entry["date"]).day for entry in entries] == [5, 10, 15, 20, 25, 30, 5]
+    assert entries[0]["notes"] == "first" and entries[0]["total"] == 600.0
+
+
+def test_export_round_trips_into_another_user(client):
+    source, exchanges = make_user(client, "source")
+    for day, kraken, binance in ((1, 1000, 500), (2, 1050, 480), (3, 990, 530)):
+        client.post("/api/entries", json={"date": f"2024-03-0{day}", "balances": [
+            {"exchange_id": exchanges["Kraken"], "amount": kraken},
+            {"exchange_id": exchanges["Binance"], "amount": binance}
+        ], "notes": f"day {day}"})
+    exported = client.get("/api/export/csv").text
+
+    target, _ = make_user(client, "target")
+    assert import_csv(client, exported).json()["imported"] == 3
+
+    source_entries = assert_consistent(source)
+    target_entries = assert_consistent(target)
+    fields = ("date", "total", "pnl_percentage", "pnl_amount", "notes")
+    assert [[entry[field] for field in fields] for entry in target_entries] == \
+        [[entry[field] for field in fields] for entry in source_entries]
+
+
+def test_dry_run_reports_errors_and_writes_nothing(client):
+    user, exchanges = make_user(client, "dry")
+    client.post("/api/entries", json={
+        "date": "2024-01-10", "balances": [{"exchange_id": exchanges["Kraken"], "amount": 1000}]
+    })
+
+    bad_rows = (
+        "Date,Kraken,Total\n"
+        "2024-01-10,1000.00,1000.00\n"
+        "not-a-date,5.00,5.00\n"
+        "2024-01-12,,0\n"
+        "2024-01-13,1200.00,1200.00\n"
+    )
+    report = import_csv(client, bad_rows, dry_run=True).json()
+    assert report["dry_run"] and report["imported"] == 0
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+
+    assert import_csv(client, bad_rows).status_code == 400
+    assert import_csv(client, "Date,Coinbase\n2024-01-13,5\n").status_code == 400
+
+    assert len(asyncio.run(stored_entries(user))) == 1
+
+
+def test_repeated_dates_in_one_file_are_errors(client):
+    user, _ = make_user(client, "repeat")
+    csv_text = (
+        "Date,Kraken\n"
+        "2024-05-01,1000.00\n"
+        "2024-05-02,1100.00\n"
+        "2024-05-01,1000.00\n"
+    )
+    report = import_csv(client, csv_text, dry_run=True).json()
+    assert report["rows"] == 2
+    assert report["errors"] == [{"line": 4, "error": "2024-05-01 is already on line 2"}]
+
+    response = import_csv(client, csv_text)
+    assert response.status_code == 400 and response.json()["detail"]["error_count"] == 1
+    assert asyncio.run(stored_entries(user)) == []
+
+
+def test_parsing_runs_off_the_event_loop(client, monkeypatch):
+    make_user(client, "threaded")
+    parse = server.parse_entries_csv
+    running_loops = []
+
+    def recording_parse(lines, exchanges):
+        try:
+            running_loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            running_loops.append(None)
+        return parse(lines, exchanges)
+
+    monkeypatch.setattr(server, "parse_entries_csv", recording_parse)
+    assert import_csv(client, "Date,Kraken\n2024-06-01,1000.00\n").json()["imported"] == 1
+    # A threadpool worker has no event loop of its own
+    assert running_loops == [None]
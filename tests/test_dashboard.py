@@ -0,0 +1,104 @@
+"""
+/dashboard returns exactly what the six endpoints it replaces return, with the
+same X-Next-Cursor header as /entries and no unbounded read of whole entries.
+"""
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server
+
+
+@pytest.fixture
+def client(api):
+    return api[0]
+
+
+def test_dashboard_matches_individual_endpoints(client):
+    client.post("/api/initialize-default-kpis")
+    kraken = client.post("/api/exchanges", json={"name": "kraken", "display_name": "Kraken", "color": "#000"}).json()
+    binance = client.post("/api/exchanges", json={"name": "binance", "display_name": "Binance", "color": "#fff"}).json()
+    for day, amounts in enumerate(((1000, 500), (1100, 450), (1050, 0), (1200, 700), (1180, 710)), start=1):
+        client.post("/api/entries", json={"date": f"2024-02-0{day}", "balances": [
+            {"exchange_id": kraken["id"], "amount": amounts[0]},
+            {"exchange_id": binance["id"], "amount": amounts[1]}
+        ]})
+    client.post("/api/capital-deposits", json={"amount": 1500, "deposit_date": "2024-02-01"})
+
+    response = client.get("/api/dashboard", params={"limit": 3, "max_points": 3})
+    dashboard = response.json()
+    entries = client.get("/api/entries", params={"limit": 3})
+    assert dashboard["entries"] == entries.json()
+    assert response.headers["X-Next-Cursor"] == entries.headers["X-Next-Cursor"]
+    assert dashboard["chart_data"] == client.get("/api/chart-data", params={"max_points": 3}).json()
+    assert dashboard["monthly_performance"] == client.get("/api/monthly-performance").json()
+    assert dashboard["exchanges"] == client.get("/api/exchanges").json()
+    assert dashboard["kpis"] == client.get("/api/kpis").json()
+
+    stats = client.get("/api/stats").json()
+    assert dashboard["stats"].keys() == stats.keys()
+    for key, value in stats.items():
+        assert dashboard["stats"][key] == (pytest.approx(value) if isinstance(value, float) else value)
+
+
+def test_empty_dashboard(client):
+    response = client.get("/api/dashboard")
+    dashboard = response.json()
+    assert dashboard["entries"] == [] and "X-Next-Cursor" not in response.headers
+    assert dashboard["stats"] == server.empty_stats()
+    assert dashboard["chart_data"]["portfolio_timeline"] == []
+
+
+def test_full_entries_are_only_read_one_page_at_a_time(client, monkeypatch):
+    exchange = client.post("/api/exchanges", json={"name": "kraken", "display_name": "Kraken", "color": "#000"}).json()
+    for day in range(1, 6):
+        client.post("/api/entries", json={"date": f"2024-03-0{day}", "balances": [
+            {"exchange_id": exchange["id"], "amount": 1000 + day}
+        ]})
+
+    reads = []
+
+    class RecordedCursor:
+        def __init__(self, cursor, projection):
+            self.cursor, self.read = cursor, {"projection": projection, "limit": None}
+            reads.append(self.read)
+
+        def sort(self, *args, **kwargs):
+            self.cursor = self.cursor.sort(*args, **kwargs)
+            return self
+
+        def limit(self, count):
+            self.read["limit"] = count
+            self.cursor = self.cursor.limit(count)
+            return self
+
+        def to_list(self, length):
+            return self.cursor.to_list(length)
+
+    class RecordedEntries:
+        def __init__(self, collection):
+            self.collection = collection
+
+        def find(self, query, projection=None):
+            return RecordedCursor(self.collection.find(query, projection), projection)
+
+        def __getattr__(self, method):
+            return getattr(self.collection, method)
+
+    class RecordedDb:
+        def __init__(self, database):
+            self.database = database
+            self.pnl_entries = RecordedEntries(database.pnl_entries)
+
+        def __getattr__(self, collection):
+            return getattr(self.database, collection)
+
+    monkeypatch.setattr(server, "db", RecordedDb(server.db))
+    response = client.get("/api/dashboard", params={"limit": 2})
+    assert len(response.json()["entries"]) == 2 and "X-Next-Cursor" in response.headers
+
+    # Whole documents are read a page at a time; the chart reads everything, but only its fields
+    assert {"projection": server.ENTRY_READ_PROJECTION, "limit": 3} in reads
+    assert {"projection": server.CHART_ENTRY_PROJECTION, "limit": None} in reads
+    assert all(read["limit"] or read["projection"] == server.CHART_ENTRY_PROJECTION for read in reads)
@@ -0,0 +1,79 @@
+"""
+LTTB downsampling against a straightforward loop implementation.
+"""
+
+import numpy as np
+
+from downsampling import extreme_indices, lttb_indices
+
+
+def reference_lttb(x, y, threshold):
+    """Textbook LTTB, one bucket at a time in plain Python"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+            avg_y = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), 10000 + np.cumsum(rng.normal(0, 100, n))
+
+
+def test_short_series_are_returned_whole():
+    x, y = random_walk(50, 0)
+    assert lttb_indices(x, y, 50).tolist() == list(range(50))
+    assert lttb_indices(x, y, 500).tolist() == list(range(50))
+
+
+def test_matches_reference_implementation():
+    for seed, (n, threshold) in enumerate([(1000, 100), (1234, 57), (365, 3), (10, 9)]):
+        x, y = random_walk(n, seed)
+        assert lttb_indices(x, y, threshold).tolist() == reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_kept_indices_survive_downsampling():
+    x, y = random_walk(5000, 7)
+    keep = extreme_indices(y)
+    selected = lttb_indices(x, y, 200, keep=keep)
+    assert len(selected) <= 200
+    assert np.all(np.diff(selected) > 0)
+    assert set(keep) <= set(selected.tolist())
+
+
+def test_adjacent_peak_and_trough_both_survive():
+    # A one-day crash right after the all-time high: peak and trough share a bucket
+    x, y = random_walk(5000, 11)
+    y[3000] = y.max() + 5000
+    y[3001] = y.min() - 5000
+    keep = extreme_indices(y)
+    assert keep == [3001, 3000, 3000, 3001]
+
+    for max_points in (200, 50, 7, 4):
+        selected = lttb_indices(x, y, max_points, keep=keep).tolist()
+        assert {3000, 3001} <= set(selected)
+        assert len(selected) <= max(max_points, 4) and selected == sorted(set(selected))
+
+
+def test_extreme_indices_find_the_deepest_drawdown():
+    y = np.array([100, 120, 90, 130, 80, 110, 140])
+    low, high, peak, trough = extreme_indices(y)
+    assert (low, high) == (4, 6)
+    assert (peak, trough) == (3, 4)
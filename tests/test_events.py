@@ -0,0 +1,70 @@
+"""
+/events: the broker's bounded queues fall back to a resync event, and write paths
+publish the written entries, their recomputed neighbours and fresh stats.
+"""
+
+import asyncio
+
+from events import RESYNC_EVENT, EventBroker, format_sse
+
+
+def test_slow_subscriber_gets_a_resync_instead_of_a_backlog():
+    async def run():
+        broker = EventBroker(queue_size=3)
+        slow, fast = broker.subscribe("user"), broker.subscribe("user")
+        for version in range(1, 4):
+            broker.publish("user", {"version": version})
+        fast.get_nowait()
+        fast.get_nowait()
+
+        assert broker.publish("user", {"version": 4}) == 2
+        assert [slow.get_nowait()] == [RESYNC_EVENT] and slow.empty()
+        assert [fast.get_nowait()["version"] for _ in range(2)] == [3, 4]
+        assert broker.stats()["resyncs"] == 1
+
+        broker.unsubscribe("user", slow)
+        broker.unsubscribe("user", fast)
+        assert not broker.has_subscribers("user") and broker.publish("user", {"version": 5}) == 0
+
+    asyncio.run(run())
+
+
+def test_format_sse():
+    assert format_sse({"type": "ready", "version": 3}) == b'data: {"type":"ready","version":3}\n\n'
+
+
+def test_entry_writes_publish_deltas(api):
+    import server
+
+    client, user = api
+    kraken = client.post("/api/exchanges", json={"name": "kraken", "display_name": "Kraken", "color": "#000"}).json()
+
+    def create(day, amount):
+        return client.post("/api/entries", json={
+            "date": f"2024-05-{day:02d}", "balances": [{"exchange_id": kraken["id"], "amount": amount}]
+        }).json()
+
+    create(1, 1000)
+    last = create(3, 1200)
+    queue = server.event_broker.subscribe(user.id)
+    try:
+        middle = create(2, 1100)
+        event = queue.get_nowait()
+        assert event["type"] == "entries.changed"
+        assert [entry["id"] for entry in event["entries"]] == [middle["id"], last["id"]]
+        assert [entry["pnl_amount"] for entry in event["entries"]] == [100.0, 100.0]
+        assert event["stats"]["total_balance"] == 1200.0 and event["stats"]["total_entries"] == 3
+
+        client.delete(f"/api/entries/{middle['id']}")
+        event = queue.get_nowait()
+        assert event["deleted"] == [middle["id"]]
+        assert [(entry["id"], entry["pnl_amount"]) for entry in event["entries"]] == [(last["id"], 200.0)]
+
+        client.post("/api/capital-deposits", json={"amount": 500, "deposit_date": "2024-05-01"})
+        event = queue.get_nowait()
+        assert event["type"] == "capital_deposit.created" and event["stats"]["total_capital_deposited"] == 500
+        assert event["version"] == asyncio.run(server.get_data_version(user.id))
+        assert queue.empty()
+    finally:
+        server.event_broker.unsubscribe(user.id, queue)
+    assert server.event_broker.stats()["subscribers"] == 0
@@ -0,0 +1,204 @@
+"""
+GoogleTokenVerifier against a local stand-in for Google's certs endpoint.
+"""
+
+import asyncio
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from google_auth import GoogleTokenVerifier, parse_max_age
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+def make_signing_key(key_id):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "certs-stand-in")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class CertsStandIn:
+    """Serves a {key_id: PEM cert} document the way googleapis.com does"""
+
+    def __init__(self, max_age=3600):
+        self.certs = {}
+        self.max_age = max_age
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                body = json.dumps(stand_in.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={stand_in.max_age}, must-revalidate, no-transform")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/oauth2/v1/certs"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add_key(self, key_id):
+        signer, cert_pem = make_signing_key(key_id)
+        self.certs[key_id] = cert_pem
+        return signer
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def certs_server():
+    server = CertsStandIn()
+    yield server
+    server.close()
+
+
+def make_token(signer, audience=CLIENT_ID, issuer="https://accounts.google.com"):
+    now = int(time.time())
+    return jwt.encode(signer, {
+        "iss": issuer,
+        "aud": audience,
+        "sub": "1234567890",
+        "email": "trader@example.com",
+        "name": "Trader",
+        "iat": now,
+        "exp": now + 300
+    }).decode()
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=19505, must-revalidate, no-transform") == 19505
+    assert parse_max_age("no-cache, max-age=60") is None
+    assert parse_max_age(None) is None
+
+
+def test_certs_are_fetched_once_within_max_age(certs_server):
+    signer = certs_server.add_key("key-1")
+    clock = FakeClock()
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url=certs_server.url, clock=clock)
+
+    for _ in range(5):
+        assert verifier.verify_sync(make_token(signer))["email"] == "trader@example.com"
+    assert certs_server.requests == 1
+
+    clock.now = certs_server.max_age
+    verifier.verify_sync(make_token(signer))
+    assert certs_server.requests == 2
+    verifier.close()
+
+
+def test_unknown_key_id_triggers_one_refresh(certs_server):
+    certs_server.add_key("key-1")
+    clock = FakeClock()
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url=certs_server.url, clock=clock)
+    verifier.get_certs()
+
+    clock.now = verifier.min_refresh_interval
+    rotated = certs_server.add_key("key-2")
+    assert verifier.verify_sync(make_token(rotated))["sub"] == "1234567890"
+    assert certs_server.requests == 2
+    verifier.close()
+
+
+def test_forged_key_ids_cannot_force_a_fetch_per_token(certs_server):
+    signer = certs_server.add_key("key-1")
+    clock = FakeClock()
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url=certs_server.url, clock=clock, min_refresh_interval=60)
+    verifier.verify_sync(make_token(signer))
+
+    for attempt in range(20):
+        forged, _ = make_signing_key(f"forged-{attempt}")
+        with pytest.raises(ValueError, match="Unknown key id"):
+            verifier.verify_sync(make_token(forged))
+    assert certs_server.requests == 1
+
+    # Once the interval has passed one refresh goes through, then the window starts over
+    clock.now = 60
+    with pytest.raises(ValueError):
+        verifier.verify_sync(make_token(forged))
+    with pytest.raises(ValueError):
+        verifier.verify_sync(make_token(forged))
+    assert certs_server.requests == 2
+    assert verifier.verify_sync(make_token(signer))["email"] == "trader@example.com"
+    verifier.close()
+
+
+def test_wrong_audience_and_issuer_are_rejected(certs_server):
+    signer = certs_server.add_key("key-1")
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url=certs_server.url)
+
+    with pytest.raises(ValueError):
+        verifier.verify_sync(make_token(signer, audience="someone-else"))
+    with pytest.raises(ValueError):
+        verifier.verify_sync(make_token(signer, issuer="https://evil.example.com"))
+    verifier.close()
+
+
+def test_verify_runs_off_the_event_loop(certs_server):
+    signer = certs_server.add_key("key-1")
+    verifier = GoogleTokenVerifier(CLIENT_ID, certs_url=certs_server.url)
+
+    verify_sync = verifier.verify_sync
+    threads = []
+
+    def recording_verify_sync(token):
+        threads.append(threading.current_thread())
+        return verify_sync(token)
+
+    verifier.verify_sync = recording_verify_sync
+
+    async def verify_burst():
+        loop_thread = threading.current_thread()
+        results = await asyncio.gather(*[verifier.verify(make_token(signer)) for _ in range(10)])
+        return loop_thread, results
+
+    loop_thread, results = asyncio.run(verify_burst())
+    assert all(idinfo["email"] == "trader@example.com" for idinfo in results)
+    assert certs_server.requests == 1
+    assert len(threads) == 10 and loop_thread not in threads
+    assert all(thread.name.startswith("google-auth") for thread in threads)
+    verifier.close()
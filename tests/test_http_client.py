@@ -0,0 +1,187 @@
+"""
+HttpClient against a local aiohttp stand-in that answers with scripted statuses:
+idempotent requests retry gateway errors and refused connections with doubling
+backoff, other methods don't, and the retry budget caps retries.
+"""
+
+import asyncio
+import logging
+import socket
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from http_client import HttpClient, RetryBudget
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class UpstreamStandIn:
+    """Answers each request with the next scripted status, and 200 once the script runs out"""
+
+    def __init__(self, script=(), port=0):
+        self.script = list(script)
+        self.port = port
+        self.requests = []
+
+        async def handle(request):
+            self.requests.append((request.method, time.monotonic()))
+            status = self.script.pop(0) if self.script else 200
+            if status == 200:
+                return web.json_response({"ok": True})
+            return web.Response(status=status, text="upstream trouble")
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handle)
+        self.runner = web.AppRunner(app)
+
+    async def __aenter__(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}/resource"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.runner.cleanup()
+
+    def gaps(self):
+        times = [requested_at for _, requested_at in self.requests]
+        return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+def run_against(script, calls, **client_options):
+    """Start the stand-in, run `calls(client, upstream)` with a started HttpClient and return the stand-in"""
+    async def run():
+        client = HttpClient(backoff=0.01, **client_options)
+        await client.start()
+        try:
+            async with UpstreamStandIn(script) as upstream:
+                await calls(client, upstream)
+                return upstream
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+def test_idempotent_requests_retry_gateway_errors(method):
+    async def calls(client, upstream):
+        assert await client.request_json(method, upstream.url) == (200, {"ok": True})
+
+    upstream = run_against([502, 503, 504], calls, max_retries=3)
+    assert [requested_method for requested_method, _ in upstream.requests] == [method] * 4
+
+
+def test_refused_connections_are_retried_until_the_upstream_is_back(caplog):
+    port = free_port()
+
+    async def run():
+        # Nothing listens on the port for the first attempt; the upstream comes up during the backoff
+        client = HttpClient(backoff=0.3)
+        await client.start()
+        upstream = UpstreamStandIn(port=port)
+        try:
+            request = asyncio.create_task(client.get_json(f"http://127.0.0.1:{port}/resource"))
+            await asyncio.sleep(0.1)
+            async with upstream:
+                assert await request == (200, {"ok": True})
+        finally:
+            await client.close()
+        return upstream
+
+    with caplog.at_level(logging.WARNING, logger="http_client"):
+        assert len(asyncio.run(run()).requests) == 1
+    # One refused attempt, then the retry reached the upstream
+    assert len(caplog.records) == 1 and "failed" in caplog.records[0].message
+
+
+def test_connection_errors_are_retried_for_idempotent_methods_only(caplog):
+    url = f"http://127.0.0.1:{free_port()}/resource"
+    budget = RetryBudget(ratio=0, min_tokens=10)
+
+    async def run():
+        client = HttpClient(backoff=0.01, max_retries=2, retry_budget=budget)
+        await client.start()
+        try:
+            for method in ("POST", "PATCH", "GET"):
+                with pytest.raises(aiohttp.ClientConnectionError):
+                    await client.request_json(method, url)
+        finally:
+            await client.close()
+
+    with caplog.at_level(logging.WARNING, logger="http_client"):
+        asyncio.run(run())
+    assert [record.message.split(" ")[0] for record in caplog.records] == ["GET", "GET"]
+    assert budget.tokens == 8
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+def test_other_methods_are_not_retried(method):
+    async def calls(client, upstream):
+        assert await client.request_json(method, upstream.url) == (503, None)
+        assert await client.request_json(method, upstream.url) == (502, None)
+
+    assert len(run_against([503, 502], calls).requests) == 2
+
+
+def test_other_statuses_are_not_retried():
+    async def calls(client, upstream):
+        assert (await client.get_json(upstream.url))[0] == 500
+        assert (await client.get_json(upstream.url))[0] == 429
+
+    assert len(run_against([500, 429], calls).requests) == 2
+
+
+def test_retries_stop_after_max_retries():
+    async def calls(client, upstream):
+        assert await client.get_json(upstream.url) == (503, None)
+        assert await client.get_json(upstream.url) == (200, {"ok": True})
+
+    assert len(run_against([503] * 3, calls, max_retries=2).requests) == 4
+
+
+def test_backoff_doubles_between_attempts():
+    async def calls(client, upstream):
+        await client.get_json(upstream.url)
+
+    upstream = run_against([503] * 3, calls, max_retries=3)
+    gaps = upstream.gaps()
+    assert len(gaps) == 3
+    for attempt, gap in enumerate(gaps):
+        assert gap >= 0.01 * 2 ** attempt
+
+
+def test_retries_stop_when_the_budget_runs_out():
+    budget = RetryBudget(ratio=0, min_tokens=2)
+
+    async def calls(client, upstream):
+        # Two tokens: the first request gets two of its five retries, the second none
+        assert (await client.get_json(upstream.url))[0] == 503
+        assert (await client.get_json(upstream.url))[0] == 503
+
+    upstream = run_against([503] * 5, calls, max_retries=5, retry_budget=budget)
+    assert len(upstream.requests) == 4
+    assert budget.tokens == 0
+
+
+def test_retry_budget_refills_with_requests_up_to_its_cap():
+    budget = RetryBudget(ratio=0.5, min_tokens=1, max_tokens=2)
+    assert budget.try_spend() and not budget.try_spend()
+
+    budget.deposit()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert budget.try_spend()
+
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
@@ -0,0 +1,146 @@
+"""
+Property test: neighbour-only PnL propagation and batch inserts must leave every
+entry exactly as a full chain recalculation would, and keep the monthly rollups
+in step.
+"""
+
+import asyncio
+import random
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server
+from pnl_engine import compute_chain_updates, rollup_deltas
+
+
+def assert_chain_consistent(entries):
+    entries = sorted(entries, key=lambda entry: (entry["date"], entry["id"]))
+    assert compute_chain_updates(entries) == []
+
+
+def assert_rollups_consistent(entries, rollups):
+    expected = rollup_deltas([], entries)
+    actual = {(r["year"], r["month"]): r for r in rollups if r["trading_days"]}
+    assert set(actual) == set(expected)
+    for month, sums in expected.items():
+        assert actual[month]["trading_days"] == sums["trading_days"]
+        assert actual[month]["pnl_percentage_sum"] == pytest.approx(sums["pnl_percentage_sum"], abs=1e-6)
+        assert actual[month]["pnl_amount_sum"] == pytest.approx(sums["pnl_amount_sum"], abs=1e-6)
+
+
+async def run_random_operations(seed, operations=60):
+    rng = random.Random(seed)
+    user = server.User(email="prop@example.com", name="Prop")
+    await server.db.exchanges.insert_many([
+        {"id": exchange_id, "user_id": user.id, "name": exchange_id} for exchange_id in ["kraken", "bitget", "binance"]
+    ])
+    # A narrow range across a month boundary forces same-day entries and month moves
+    start = date(2024, 1, 27)
+
+    def random_balances():
+        return [
+            server.DynamicBalance(exchange_id=exchange_id, amount=round(rng.uniform(0, 5000), 2))
+            for exchange_id in rng.sample(["kraken", "bitget", "binance"], rng.randint(1, 3))
+        ]
+
+    def random_date():
+        return start + timedelta(days=rng.randint(0, 9))
+
+    for _ in range(operations):
+        entries = await server.db.pnl_entries.find({"user_id": user.id}).to_list(None)
+        action = rng.choice(["create", "create", "batch", "update_balances", "update_date", "delete"]) if entries else "create"
+
+        if action == "create":
+            await server.create_pnl_entry(
+                server.PnLEntryCreate(date=random_date(), balances=random_balances()),
+                current_user=user
+            )
+        elif action == "batch":
+            await server.create_pnl_entries_batch(
+                [server.PnLEntryCreate(date=random_date(), balances=random_balances()) for _ in range(rng.randint(1, 5))],
+                current_user=user
+            )
+        elif action == "update_balances":
+            await server.update_pnl_entry(
+                rng.choice(entries)["id"],
+                server.PnLEntryUpdate(balances=random_balances()),
+                current_user=user
+            )
+        elif action == "update_date":
+            await server.update_pnl_entry(
+                rng.choice(entries)["id"],
+                server.PnLEntryUpdate(date=random_date()),
+                current_user=user
+            )
+        else:
+            await server.delete_pnl_entry(rng.choice(entries)["id"], current_user=user)
+
+        entries = await server.db.pnl_entries.find({"user_id": user.id}).to_list(None)
+        assert_chain_consistent(entries)
+        assert_rollups_consistent(entries, await server.db.pnl_monthly_rollups.find({"user_id": user.id}).to_list(None))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_propagation_matches_full_recalculation(seed, mongo_db):
+    asyncio.run(run_random_operations(seed))
+
+
+def test_compute_chain_updates_skips_unchanged_entries():
+    entries = [
+        {"id": "a", "balances": [{"amount": 100.0}], "total": 100.0, "pnl_amount": 0.0, "pnl_percentage": 0.0},
+        {"id": "b", "balances": [{"amount": 110.0}], "total": 110.0, "pnl_amount": 10.0, "pnl_percentage": 10.0},
+        {"id": "c", "balances": [{"amount": 99.0}], "total": 0.0, "pnl_amount": 0.0, "pnl_percentage": 0.0},
+    ]
+
+    updates = compute_chain_updates(entries)
+
+    assert updates == [{"id": "c", "set": {"total": 99.0, "pnl_percentage": -10.0, "pnl_amount": -11.0}}]
+
+
+def test_batch_reports_per_item_results(mongo_db):
+    async def run():
+        user = server.User(email="batch@example.com", name="Batch")
+        await server.db.exchanges.insert_one({"id": "kraken", "user_id": user.id, "name": "kraken"})
+        return await server.create_pnl_entries_batch([
+            server.PnLEntryCreate(date=date(2024, 1, 3), balances=[server.DynamicBalance(exchange_id="kraken", amount=110)]),
+            server.PnLEntryCreate(date=date(2024, 1, 2), balances=[server.DynamicBalance(exchange_id="coinbase", amount=5)]),
+            server.PnLEntryCreate(date=date(2024, 1, 1), balances=[server.DynamicBalance(exchange_id="kraken", amount=100)]),
+            server.PnLEntryCreate(date=date(2024, 1, 4), balances=[]),
+        ], current_user=user)
+
+    response = asyncio.run(run())
+
+    assert (response["created"], response["failed"]) == (2, 2)
+    assert [result["status"] for result in response["results"]] == ["created", "error", "created", "error"]
+    later, earlier = response["results"][0]["entry"], response["results"][2]["entry"]
+    assert (earlier["pnl_percentage"], later["pnl_percentage"], later["pnl_amount"]) == (0.0, 10.0, 10.0)
+
+
+def test_missing_rollups_are_rebuilt_on_read_and_drift_is_rounded_off(mongo_db):
+    async def run():
+        user = server.User(email="backfill@example.com", name="Backfill")
+        for day, amount in ((1, 100), (2, 110.1), (3, 99.2)):
+            await server.create_pnl_entry(server.PnLEntryCreate(
+                date=date(2024, 1, day), balances=[server.DynamicBalance(exchange_id="kraken", amount=amount)]
+            ), current_user=user)
+        stored = await server.db.pnl_entries.find({"user_id": user.id}).to_list(None)
+
+        # Entries written before the rollups existed
+        await server.db.pnl_monthly_rollups.delete_many({"user_id": user.id})
+        (month,) = await server.get_monthly_rollups(user.id)
+        assert await server.db.pnl_monthly_rollups.count_documents({"user_id": user.id}) == 1
+
+        # Float error from many $inc deltas doesn't reach the reports
+        await server.db.pnl_monthly_rollups.update_one(
+            {"user_id": user.id}, {"$inc": {"pnl_amount_sum": 3e-12, "pnl_percentage_sum": -3e-12}}
+        )
+        return stored, month, (await server.get_monthly_rollups(user.id))[0]
+
+    stored, month, drifted = asyncio.run(run())
+    (expected,) = rollup_deltas([], stored).values()
+    assert month["trading_days"] == drifted["trading_days"] == 2
+    assert month["pnl_amount_sum"] == drifted["pnl_amount_sum"] == round(expected["pnl_amount_sum"], 2)
+    assert month["pnl_percentage_sum"] == drifted["pnl_percentage_sum"] == round(expected["pnl_percentage_sum"], 2)
@@ -0,0 +1,207 @@
+import asyncio
+import os
+
+import pytest
+
+from indexes import check_query_plans, ensure_indexes, find_collection_scans
+
+
+def test_find_collection_scans_walks_nested_stages():
+    plan = {
+        "stage": "SORT",
+        "inputStage": {
+            "stage": "OR",
+            "inputStages": [
+                {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "user_date_id"}},
+                {"stage": "COLLSCAN", "filter": {"date": {"$eq": "2024-01-01"}}},
+            ]
+        }
+    }
+
+    scans = find_collection_scans(plan)
+
+    assert len(scans) == 1
+    assert scans[0]["filter"] == {"date": {"$eq": "2024-01-01"}}
+
+
+def test_index_scan_plan_is_clean():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "session_token_unique"}}
+    assert find_collection_scans(plan) == []
+
+
+def test_no_query_shape_uses_a_collection_scan():
+    if not os.environ.get("EXPLAIN_MONGO_URL"):
+        # CI provides a mongod (see .github/workflows/backend-tests.yml), so there a missing URL is a failure
+        if os.environ.get("CI"):
+            pytest.fail("EXPLAIN_MONGO_URL must point at a mongod in CI")
+        pytest.skip("EXPLAIN_MONGO_URL not set")
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def check():
+        client = AsyncIOMotorClient(os.environ["EXPLAIN_MONGO_URL"])
+        db = client["crypto_pnl_explain_check"]
+        try:
+            await ensure_indexes(db)
+            return await check_query_plans(db)
+        finally:
+            await client.drop_database("crypto_pnl_explain_check")
+            client.close()
+
+    assert asyncio.run(check()) == []
+
+
+def test_duplicate_keys_stop_startup_until_deduped(mongo_db, monkeypatch):
+    from datetime import datetime, timedelta
+
+    import manage
+    import server
+    from pnl_engine import compute_chain_updates
+
+    monkeypatch.setattr(manage, "db", mongo_db)
+
+    async def run():
+        user = server.User(email="dupes@example.com", name="Dupes")
+        await mongo_db.users.insert_many([user.dict(), user.dict()])
+        session = {"user_id": user.id, "session_token": "t", "expires_at": datetime.utcnow() + timedelta(days=1)}
+        await mongo_db.user_sessions.insert_many([dict(session), dict(session)])
+        for day, amount in ((1, 100), (2, 110)):
+            await server.create_pnl_entry(server.PnLEntryCreate(
+                date=datetime(2024, 1, day).date(), balances=[server.DynamicBalance(exchange_id="kraken", amount=amount)]
+            ), current_user=user)
+        first = await mongo_db.pnl_entries.find_one({"user_id": user.id}, sort=[("date", 1)])
+        # A second copy of the first entry with a different balance
+        del first["_id"]
+        await mongo_db.pnl_entries.insert_one({**first, "balances": [{"exchange_id": "kraken", "amount": 50}]})
+
+        with pytest.raises(RuntimeError, match="manage.py dedupe"):
+            await ensure_indexes(mongo_db)
+
+        removed = await manage.remove_duplicate_keys(echo=lambda message: None)
+        await ensure_indexes(mongo_db)
+        entries = await mongo_db.pnl_entries.find({"user_id": user.id}).sort("date", 1).to_list(None)
+        return removed, entries
+
+    removed, entries = asyncio.run(run())
+    assert removed == 3
+    assert compute_chain_updates(entries) == []
+    assert [entry["total"] for entry in entries] == [100.0, 110.0]
+
+
+FILTER_METHODS = {
+    "find", "find_one", "find_one_and_update", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents"
+}
+
+
+class RecordingDb:
+    """Wraps a database and records (collection, filter) for every query sent through it"""
+
+    def __init__(self, database):
+        self.database = database
+        self.filters = []
+
+    def __getattr__(self, collection):
+        return RecordingCollection(self, collection, getattr(self.database, collection))
+
+    def __getitem__(self, collection):
+        return getattr(self, collection)
+
+
+class RecordingCollection:
+    def __init__(self, db, name, collection):
+        self.db = db
+        self.name = name
+        self.collection = collection
+
+    def __getattr__(self, method):
+        target = getattr(self.collection, method)
+        if method not in FILTER_METHODS | {"aggregate", "bulk_write", "distinct"}:
+            return target
+
+        def record(*args, **kwargs):
+            if method in FILTER_METHODS:
+                self.db.filters.append((self.name, args[0] if args else kwargs.get("filter", {})))
+            elif method == "distinct":
+                self.db.filters.append((self.name, args[1] if len(args) > 1 else kwargs.get("filter", {})))
+            elif method == "aggregate":
+                match = args[0][0].get("$match") if args[0] else None
+                self.db.filters.append((self.name, match or {}))
+            else:
+                self.db.filters.extend((self.name, op._filter) for op in args[0] if hasattr(op, "_filter"))
+            return target(*args, **kwargs)
+
+        return record
+
+
+def exercise_routes(client, headers):
+    """Call every data route once, with enough data for the interesting paths to run"""
+    def call(method, path, **kwargs):
+        response = client.request(method, f"/api{path}", headers={**headers, **kwargs.pop("headers", {})}, **kwargs)
+        assert response.status_code < 400, (method, path, response.text)
+        return response
+
+    call("POST", "/initialize-default-exchanges")
+    call("POST", "/initialize-default-kpis")
+    kraken = call("POST", "/exchanges", json={"name": "ledger", "display_name": "Kraken", "color": "#000"}).json()
+    spare = call("POST", "/exchanges", json={"name": "spare", "display_name": "Spare", "color": "#fff"}).json()
+    kpi = call("POST", "/kpis", json={"name": "Moon", "target_amount": 50000, "color": "#000"}).json()
+    call("PUT", f"/kpis/{kpi['id']}", json={"name": "Moon", "target_amount": 60000, "color": "#111"})
+
+    def balances(amount):
+        return [{"exchange_id": kraken["id"], "amount": amount}]
+
+    entries = [call("POST", "/entries", json={"date": f"2024-05-0{day}", "balances": balances(1000 + day * 10)}).json()
+               for day in (1, 3, 5)]
+    call("POST", "/entries/batch", json=[{"date": "2024-05-02", "balances": balances(990)}])
+    call("PUT", f"/entries/{entries[1]['id']}", json={"balances": balances(1100)})
+    call("PUT", f"/entries/{entries[1]['id']}", json={"date": "2024-05-04"})
+    call("GET", f"/entries/{entries[0]['id']}")
+    cursor = call("GET", "/entries", params={"limit": 1}).headers["X-Next-Cursor"]
+    call("GET", "/entries", params={"limit": 1, "before": cursor, "start_date": "2024-05-01"})
+    call("GET", "/entries", params={"limit": 1, "after": cursor, "end_date": "2024-06-01"})
+    call("DELETE", f"/entries/{entries[2]['id']}")
+    call("POST", "/entries/recalculate", params={"from_date": "2024-05-02"})
+    call("POST", "/import/csv", files={"file": ("entries.csv", b"Date,Kraken\n2024-06-01,1500\n", "text/csv")})
+
+    call("POST", "/starting-balances", json={"exchange_id": kraken["id"], "starting_balance": 900, "starting_date": "2024-01-01"})
+    call("POST", "/starting-balances", json={"exchange_id": kraken["id"], "starting_balance": 950, "starting_date": "2024-01-01"})
+    call("GET", "/starting-balances")
+    deposit = call("POST", "/capital-deposits", json={"amount": 1000, "deposit_date": "2024-04-01"}).json()["deposit"]
+    call("PUT", f"/capital-deposits/{deposit['id']}", json={"amount": 1200, "deposit_date": "2024-04-01"})
+    call("GET", "/capital-deposits")
+
+    for path in ("/auth/me", "/exchanges", "/kpis", "/stats", "/monthly-performance", "/chart-data",
+                 "/dashboard", "/export/csv", "/export/parquet", "/export/arrow",
+                 "/analytics/risk", "/analytics/returns", "/analytics/attribution"):
+        call("GET", path)
+
+    call("DELETE", f"/capital-deposits/{deposit['id']}")
+    call("DELETE", f"/starting-balances/{kraken['id']}")
+    call("DELETE", f"/kpis/{kpi['id']}")
+    call("DELETE", f"/exchanges/{kraken['id']}")
+    call("DELETE", f"/exchanges/{spare['id']}")
+    call("POST", "/auth/logout", headers={"Cookie": f"session_token={headers['Authorization'][7:]}"})
+
+
+def test_every_route_filter_has_a_query_shape(mongo_db, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from fastapi.testclient import TestClient
+
+    import server
+    from indexes import QUERY_SHAPES, query_fields
+
+    user = server.User(email="shapes@example.com", name="Shapes")
+    asyncio.run(mongo_db.users.insert_one(user.dict()))
+    asyncio.run(mongo_db.user_sessions.insert_one({
+        "user_id": user.id, "session_token": "shapes-token", "expires_at": datetime.utcnow() + timedelta(days=1)
+    }))
+    database = RecordingDb(mongo_db)
+    monkeypatch.setattr(server, "db", database)
+
+    exercise_routes(TestClient(server.app), {"Authorization": "Bearer shapes-token"})
+
+    declared = {(collection, query_fields(query)) for collection, query, _ in QUERY_SHAPES}
+    sent = {(collection, query_fields(query)) for collection, query in database.filters}
+    missing = sorted(sent - declared)
+    assert not missing, "Route filters missing from QUERY_SHAPES:\n" + "\n".join(map(str, missing))
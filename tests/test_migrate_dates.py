@@ -0,0 +1,66 @@
+"""
+manage.py migrate-dates: writes made while some entries still have string dates
+compute PnL against the wrong neighbours; the migration converts the dates and
+then repairs each affected user's chain and rollups.
+"""
+
+import asyncio
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import manage
+import server
+from pnl_engine import compute_chain_updates, rollup_deltas
+
+
+def legacy_entry(user_id, day, total, previous_total):
+    """An entry as stored before the migration, with an ISO string date"""
+    pnl_amount = total - previous_total if previous_total else 0.0
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "date": date(2024, 1, day).isoformat(),
+        "balances": [{"exchange_id": "kraken", "amount": total}],
+        "total": total,
+        "pnl_amount": pnl_amount,
+        "pnl_percentage": round(pnl_amount / previous_total * 100, 2) if previous_total else 0.0,
+        "notes": "",
+        "created_at": datetime.utcnow()
+    }
+
+
+def test_migration_repairs_chains_written_during_the_window(mongo_db, monkeypatch):
+    database = mongo_db
+    monkeypatch.setattr(manage, "db", database)
+    user = server.User(email="legacy@example.com", name="Legacy")
+
+    async def run():
+        legacy = [legacy_entry(user.id, 1, 1000.0, None), legacy_entry(user.id, 3, 1200.0, 1000.0)]
+        await database.pnl_entries.insert_many(legacy)
+        await server.apply_rollup_deltas(user.id, rollup_deltas([], legacy))
+
+        # Lands between the two string-dated entries but can't see either of them
+        await server.create_pnl_entry(server.PnLEntryCreate(
+            date=date(2024, 1, 2), balances=[server.DynamicBalance(exchange_id="kraken", amount=1100)]
+        ), current_user=user)
+        entries = await database.pnl_entries.find({"user_id": user.id}).to_list(None)
+        assert [entry["pnl_amount"] for entry in entries if entry["total"] == 1100.0] == [0.0]
+
+        migrated, users = await manage.migrate_entry_dates(batch_size=1, echo=lambda message: None)
+        assert (migrated, users) == (2, 1)
+
+        entries = await database.pnl_entries.find({"user_id": user.id}).sort([("date", 1), ("id", 1)]).to_list(None)
+        assert all(isinstance(entry["date"], datetime) for entry in entries)
+        assert compute_chain_updates(entries) == []
+        assert [entry["pnl_amount"] for entry in entries] == [0.0, 100.0, 100.0]
+
+        rollups = await database.pnl_monthly_rollups.find({"user_id": user.id}).to_list(None)
+        expected = rollup_deltas([], entries)[(2024, 1)]
+        assert [(rollup["trading_days"], rollup["pnl_amount_sum"]) for rollup in rollups] == \
+            [(expected["trading_days"], expected["pnl_amount_sum"])]
+
+    asyncio.run(run())
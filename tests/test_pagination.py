@@ -0,0 +1,115 @@
+"""
+/entries keyset pagination: before/after cursors walk the (date, id) chain
+newest first without gaps or repeats, also inside a date range, and X-Next-Cursor
+round-trips.
+"""
+
+import asyncio
+import base64
+from datetime import date
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+import server
+
+DAYS = {1: ["1-a"], 2: ["2-a"], 3: ["3-a", "3-b", "3-c"], 4: ["4-a"], 5: ["5-a"]}
+# (date, id) descending
+NEWEST_FIRST = ["5-a", "4-a", "3-c", "3-b", "3-a", "2-a", "1-a"]
+
+
+@pytest.fixture
+def client(api):
+    client, user = api
+
+    async def seed():
+        documents = []
+        for day, entry_ids in DAYS.items():
+            for entry_id in entry_ids:
+                document = server.new_entry_document(user.id, server.PnLEntryCreate(
+                    date=date(2024, 5, day), balances=[server.DynamicBalance(exchange_id="kraken", amount=100 * day)]
+                ))
+                document["id"] = entry_id
+                documents.append(document)
+        await server.db.pnl_entries.insert_many(documents)
+
+    asyncio.run(seed())
+    return client
+
+
+def walk(client, direction, limit, **params):
+    """Follow X-Next-Cursor under `direction` until it runs out; returns the pages' ids"""
+    pages = []
+    cursor = params.pop(direction, None)
+    while True:
+        response = client.get("/api/entries", params={"limit": limit, **params, **({direction: cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([entry["id"] for entry in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_before_walks_newest_first(client):
+    pages = walk(client, "before", 2)
+    assert pages == [["5-a", "4-a"], ["3-c", "3-b"], ["3-a", "2-a"], ["1-a"]]
+
+
+def test_after_walks_back_towards_the_newest(client):
+    oldest = client.get("/api/entries", params={"start_date": "2024-05-01", "end_date": "2024-05-01"}).json()[0]
+    pages = walk(client, "after", 2, after=server.encode_entry_cursor(oldest))
+    # Each page is newest first; the pages themselves come oldest first
+    assert pages == [["3-a", "2-a"], ["3-c", "3-b"], ["5-a", "4-a"]]
+    assert [entry_id for page in reversed(pages) for entry_id in page] == NEWEST_FIRST[:-1]
+
+
+def test_next_cursor_round_trips(client):
+    response = client.get("/api/entries", params={"limit": 3})
+    last = response.json()[-1]
+    cursor = response.headers["X-Next-Cursor"]
+
+    assert server.decode_entry_cursor(cursor) == (server.to_db_date(date(2024, 5, 3)), last["id"])
+    assert server.encode_entry_cursor(last) == cursor
+    following = client.get("/api/entries", params={"limit": 3, "before": cursor}).json()
+    assert [entry["id"] for entry in following] == NEWEST_FIRST[3:6]
+    # And back again
+    back = client.get("/api/entries", params={"limit": 3, "after": server.encode_entry_cursor(following[0])}).json()
+    assert [entry["id"] for entry in back] == NEWEST_FIRST[:3]
+
+
+def test_date_range_combines_with_cursors(client):
+    params = {"start_date": "2024-05-02", "end_date": "2024-05-04"}
+    assert walk(client, "before", 2, **params) == [["4-a", "3-c"], ["3-b", "3-a"], ["2-a"]]
+
+    first = client.get("/api/entries", params={"limit": 2, **params})
+    after = walk(client, "after", 2, after=first.headers["X-Next-Cursor"], **params)
+    assert after == [["4-a"]]
+
+
+def test_same_date_entries_page_by_id(client):
+    params = {"start_date": "2024-05-03", "end_date": "2024-05-03"}
+    assert walk(client, "before", 1, **params) == [["3-c"], ["3-b"], ["3-a"]]
+
+    newest_of_day = client.get("/api/entries", params=params).json()
+    assert [entry["id"] for entry in newest_of_day] == ["3-c", "3-b", "3-a"]
+    middle = client.get("/api/entries", params={"after": server.encode_entry_cursor(newest_of_day[2]), **params}).json()
+    assert [entry["id"] for entry in middle] == ["3-c", "3-b"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "%%%",
+    base64.urlsafe_b64encode(b"no separator").decode(),
+    base64.urlsafe_b64encode(b"2024-13-01|1-a").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|1-a").decode(),
+])
+def test_bad_cursor_is_rejected(client, cursor):
+    for direction in ("before", "after"):
+        response = client.get("/api/entries", params={direction: cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_before_and_after_together_are_rejected(client):
+    cursor = client.get("/api/entries", params={"limit": 1}).headers["X-Next-Cursor"]
+    assert client.get("/api/entries", params={"before": cursor, "after": cursor}).status_code == 400
@@ -0,0 +1,136 @@
+"""
+Session cache through the API: a cached session answers repeat requests without
+touching user_sessions or users, never outlives the session's expires_at, and
+logout drops it.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from fastapi.testclient import TestClient
+
+import server
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingDb:
+    """Wraps a database and records (collection, method) for every call made through it"""
+
+    def __init__(self, database):
+        self.database = database
+        self.calls = []
+
+    def __getattr__(self, collection):
+        return CountingCollection(self, collection, getattr(self.database, collection))
+
+    def __getitem__(self, collection):
+        return getattr(self, collection)
+
+    def session_lookups(self):
+        return [call for call in self.calls if call[0] in ("user_sessions", "users")]
+
+
+class CountingCollection:
+    def __init__(self, db, name, collection):
+        self.db = db
+        self.name = name
+        self.collection = collection
+
+    def __getattr__(self, method):
+        self.db.calls.append((self.name, method))
+        return getattr(self.collection, method)
+
+
+@pytest.fixture
+def counted_db(mongo_db, monkeypatch):
+    database = CountingDb(mongo_db)
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server, "session_cache", TTLCache(maxsize=16, ttl=60, clock=clock))
+    return clock
+
+
+def sign_in(database, expires_in):
+    user = server.User(email="session@example.com", name="Session")
+    token = f"token-{user.id}"
+
+    async def insert():
+        await database.users.insert_one(user.dict())
+        await database.user_sessions.insert_one({
+            "user_id": user.id,
+            "session_token": token,
+            "expires_at": datetime.utcnow() + expires_in
+        })
+
+    asyncio.run(insert())
+    database.calls.clear()
+    return user, token
+
+
+def test_repeat_requests_skip_the_session_lookup(counted_db, clock):
+    user, token = sign_in(counted_db, timedelta(days=7))
+    client = TestClient(server.app)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/api/auth/me", headers=headers).json()["id"] == user.id
+    assert counted_db.session_lookups() == [("user_sessions", "find_one"), ("users", "find_one")]
+
+    counted_db.calls.clear()
+    assert client.get("/api/auth/me", headers=headers).json()["id"] == user.id
+    assert client.get("/api/exchanges", headers=headers).status_code == 200
+    assert counted_db.session_lookups() == []
+    assert server.session_cache.stats()["hits"] == 2
+
+
+def test_cached_session_never_outlives_expires_at(counted_db, clock, monkeypatch):
+    _, token = sign_in(counted_db, timedelta(seconds=5))
+    client = TestClient(server.app)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    # The cache entry's own TTL is cut down to the five seconds the session has left
+    clock.now = 5
+    counted_db.calls.clear()
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert ("user_sessions", "find_one") in counted_db.session_lookups()
+
+    # And a cached entry that is still within its TTL is dropped once expires_at passes
+    expired = datetime.utcnow() + timedelta(seconds=6)
+
+    class LaterDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return expired
+
+    monkeypatch.setattr(server, "datetime", LaterDatetime)
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    assert client.get("/api/exchanges", headers=headers).status_code == 401
+    assert len(server.session_cache) == 0
+
+
+def test_logout_invalidates_the_token(counted_db, clock):
+    _, token = sign_in(counted_db, timedelta(days=7))
+    client = TestClient(server.app)
+    cookie = {"Cookie": f"session_token={token}"}
+    assert client.get("/api/exchanges", headers=cookie).status_code == 200
+
+    assert client.post("/api/auth/logout", headers=cookie).status_code == 200
+    assert client.get("/api/exchanges", headers=cookie).status_code == 401
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401